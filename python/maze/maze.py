@@ -1,81 +1,86 @@
 import tkinter as tk
-import random
-from dataclasses import dataclass
-from collections import deque
-
-DIRS = {
-    "N": (0, -1),
-    "E": (1, 0),
-    "S": (0, 1),
-    "W": (-1, 0),
-}
-OPP = {"N": "S", "S": "N", "E": "W", "W": "E"}
-
-
-def generate_maze_prim(w, h, seed=None):
-    """
-    Perfect maze (unique solution) using randomized Prim's algorithm on a grid.
-    Produces lots of branching and short dead ends.
-    """
-    rng = random.Random(seed)
-
-    walls = [[{"N": True, "E": True, "S": True, "W": True} for _ in range(w)] for _ in range(h)]
-    in_maze = [[False for _ in range(w)] for _ in range(h)]
-    frontier = []
-
-    def add_frontier_edges(x, y):
-        for d, (dx, dy) in DIRS.items():
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < w and 0 <= ny < h and not in_maze[ny][nx]:
-                frontier.append((x, y, d))
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 
-    sx, sy = rng.randrange(w), rng.randrange(h)
-    in_maze[sy][sx] = True
-    add_frontier_edges(sx, sy)
+from maze_gen import mask_cells
+from maze_model import MazeModel
+from maze_pack import LevelPack
 
-    while frontier:
-        idx = rng.randrange(len(frontier))
-        x, y, d = frontier.pop(idx)
-        dx, dy = DIRS[d]
-        nx, ny = x + dx, y + dy
-        if not (0 <= nx < w and 0 <= ny < h):
-            continue
-        if in_maze[ny][nx]:
-            continue
 
-        walls[y][x][d] = False
-        walls[ny][nx][OPP[d]] = False
+# Keys to (player, direction) for TwoPlayerMazeGame.queue_move()
+KEY_MOVES = {
+    "w": ("p1", "N"), "d": ("p1", "E"), "s": ("p1", "S"), "a": ("p1", "W"),
+    "Up": ("p2", "N"), "Right": ("p2", "E"), "Down": ("p2", "S"), "Left": ("p2", "W"),
+}
 
-        in_maze[ny][nx] = True
-        add_frontier_edges(nx, ny)
 
-    return walls
+def camera_start(start, size, a, b, lo, hi):
+    """
+    First cell of a size-cell view along one axis, for players at a and b
+    in cells lo..hi-1. The view stays where it starts while both players are
+    at least a quarter screen from its edges, and otherwise re-centers on them.
+    """
+    edge = size // 4
+    if start + edge <= min(a, b) and max(a, b) < start + size - edge:
+        return start
+    mid = (a + b) // 2
+    return max(lo, min(mid - size // 2, hi - size))
+
+
+def wall_runs(n, walled):
+    """(start, end) of each run of consecutive i in range(n) with walled(i), end exclusive."""
+    runs = []
+    start = None
+    for i in range(n):
+        if walled(i):
+            if start is None:
+                start = i
+        elif start is not None:
+            runs.append((start, i))
+            start = None
+    if start is not None:
+        runs.append((start, n))
+    return runs
 
 
 @dataclass
-class Player:
-    name: str
-    color: str
-    x: int
-    y: int
-    oval_id: int = None
-    trail_points: list = None
+class PlayerItems:
+    """A player's canvas items, kept by TwoPlayerMazeGame under the player's name."""
+    oval: int = None
+    trails: list = field(default_factory=list)   # trail line items
+    # The line of the last stroke, to extend: (line item, stroke, index of
+    # its first point, of its last, last point), no item when off the screen
+    tail: tuple = (None, None, 0, -1, None)
 
 
 class TwoPlayerMazeGame:
-    def __init__(self, root):
+    """
+    Tk view of a MazeModel: draws it, and turns keys and the topbar
+    controls into model calls.
+    """
+    def __init__(self, root, size=None, pack=None):
         self.root = root
         self.root.title("Two-Player Maze Race (Fog + Apples)")
 
-        # Level parameters
-        self.level = 1
-        self.base_w = 10
-        self.base_h = 10
+        self.model = MazeModel(size)
+        self.model.pack = pack
+        self.player_items = {"P1": PlayerItems(), "P2": PlayerItems()}
         self.cell = 28
         self.margin = 16
 
-        # Start column parameter (None -> center)
-        self.start_x_override = None
+        # Endless descent shows endless_rows rows at a time
+        self.endless_rows = 20
+
+        # Camera: at most view_cols x view_rows cells are on screen, bigger
+        # mazes scroll to follow the players. view_left, view_top is the
+        # top-left cell on screen.
+        self.view_cols = 30
+        self.view_rows = 30
+        self.view_left = 0
+        self.view_top = 0
 
         # UI topbar
         self.topbar = tk.Frame(root)
@@ -118,12 +123,28 @@ class TwoPlayerMazeGame:
         )
         self.glass_cb.pack(side="right", padx=8)
 
+        # Endless descent checkbox. Default False.
+        self.endless_var = tk.BooleanVar(value=False)
+        self.endless_cb = tk.Checkbutton(
+            self.topbar,
+            text="Endless",
+            variable=self.endless_var,
+            command=self.on_toggle_endless
+        )
+        self.endless_cb.pack(side="right", padx=8)
+
         self.canvas = tk.Canvas(root, highlightthickness=0, bg="black")
         self.canvas.pack()
 
         self.message = tk.Label(root, text="", fg="black")
         self.message.pack(pady=6)
 
+        # Keys are held and applied together every tick_ms, at most
+        # max_moves_per_tick moves per player a tick, see queue_move()
+        self.tick_ms = 15
+        self.max_moves_per_tick = 3
+        self.pending_moves = []
+        self.tick_pending = False
         self.root.bind("<KeyPress>", self.on_key)
 
         self.build_level()
@@ -132,106 +153,127 @@ class TwoPlayerMazeGame:
     # Level + sizing
     # -----------------------
 
-    def level_size(self, lvl):
-        w = self.base_w + (lvl - 1) * 2
-        h = self.base_h + (lvl - 1) * 2
-        return min(w, 30), min(h, 30)
-
-    def choose_start_x(self):
-        if self.start_x_override is not None:
-            return max(0, min(self.w - 1, self.start_x_override))
-        return self.w // 2
-
-    def apple_target_for_size(self, w, h):
+    def build_level(self, prepared=None):
         """
-        Starts at 3, ramps up to 5 for largest mazes.
+        Show the current level: prepared (from prepare_next_level()) if given,
+        else made here. Prints how long the swap took, then starts
+        preparing the level after it.
         """
-        m = max(w, h)
-        # 10 -> 3, ~16 -> 4, ~22+ -> 5
-        if m >= 22:
-            return 5
-        if m >= 16:
-            return 4
-        return 3
-
-    def place_apples(self):
-        """
-        Place apples in random cells not equal to start or goal.
-        """
-        rng = random.Random()
-        target = self.apple_target_for_size(self.w, self.h)
-        self.apple_target = target
-        self.apples_collected = 0
-
-        forbidden = {(self.start_x, self.start_y), (self.goal_x, self.goal_y)}
-        apples = set()
-
-        # Prefer spreading them out: simple retry method
-        attempts = 0
-        while len(apples) < target and attempts < 20000:
-            attempts += 1
-            x = rng.randrange(self.w)
-            y = rng.randrange(self.h)
-            if (x, y) in forbidden or (x, y) in apples:
-                continue
-            # avoid clustering too close to start if possible
-            if abs(x - self.start_x) + abs(y - self.start_y) < 3:
-                continue
-            apples.add((x, y))
-
-        # if we were too strict, relax
-        while len(apples) < target:
-            x = rng.randrange(self.w)
-            y = rng.randrange(self.h)
-            if (x, y) in forbidden or (x, y) in apples:
-                continue
-            apples.add((x, y))
-
-        self.apples = apples
-
-    def build_level(self):
+        start = time.perf_counter()
+        m = self.model
         self.message.config(text="")
-        self.w, self.h = self.level_size(self.level)
-        self.walls = generate_maze_prim(self.w, self.h)
-
-        # Players start on same square at top middle
-        self.start_x = self.choose_start_x()
-        self.start_y = 0
-
-        self.p1 = Player("P1", "#2ecc71", self.start_x, self.start_y, trail_points=[])
-        self.p2 = Player("P2", "#3498db", self.start_x, self.start_y, trail_points=[])
-
-        # Finish is one cell on bottom row
-        self.goal_y = self.h - 1
-        self.goal_x = random.randint(0, self.w - 1)
-
-        # Apples
-        self.place_apples()
+        m.peek = int(self.peek_var.get())
+        m.build_level(prepared)
+        self.pending_moves.clear()
         self.update_apples_hud()
 
-        width_px = self.margin * 2 + self.w * self.cell
-        height_px = self.margin * 2 + self.h * self.cell
+        self.view_left = self.view_top = 0
+        cols, rows = self.screen_size()
+        width_px = self.margin * 2 + cols * self.cell
+        height_px = self.margin * 2 + rows * self.cell
         self.canvas.config(width=width_px, height=height_px)
-
-        # Reset reveal
-        self.revealed_cells = set()
-
-        # Initial visibility
-        self.update_visibility()
+        self.follow_players()
 
         self.redraw_world()
         self.update_status()
 
+        self.swap_seconds = time.perf_counter() - start
+        if prepared is None:
+            print(f"Level {m.level}: built in {self.swap_seconds * 1000:.1f} ms")
+        else:
+            print(f"Level {m.level}: swapped in {self.swap_seconds * 1000:.1f} ms, "
+                  f"prepared in the background in {prepared.prepare_seconds * 1000:.1f} ms")
+        self.prepare_next_level()
+
+    def prepare_next_level(self):
+        """
+        Make the next level on a background thread while this one is played,
+        so the level change only has to swap it in. Not for endless mode,
+        which has no next level.
+        """
+        self.next_prepared = None
+        if self.model.endless:
+            return
+        future = Future()
+        level, seed = self.model.level + 1, self.model.rng.getrandbits(32)
+
+        def work():
+            try:
+                future.set_result(self.model.prepare_level(level, seed))
+            except Exception as e:
+                future.set_exception(e)
+        threading.Thread(target=work, daemon=True).start()
+        self.next_prepared = future
+
     def restart_level(self):
         self.build_level()
 
     def next_level(self, winner_name):
-        self.message.config(text=f"{winner_name} finished! Level up → {self.level + 1}")
-        self.level += 1
-        self.root.after(700, self.build_level)
+        self.message.config(text=f"{winner_name} finished! Level up → {self.model.level + 1}")
+        self.model.level += 1
+        self.root.after(700, self.swap_in_level)
+
+    def swap_in_level(self):
+        """Build the new level from the prepared one, waiting for it if it is not ready."""
+        future = self.next_prepared
+        if future is not None and not future.done():
+            self.root.after(20, self.swap_in_level)
+            return
+        try:
+            prepared = future.result() if future is not None else None
+        except Exception as e:
+            # An error in the background worker would otherwise escape into Tk
+            print(f"Level {self.model.level}: preparing failed ({e!r}), building it here")
+            prepared = None
+        if prepared is not None and not self.model.fits(prepared):
+            prepared = None
+        self.build_level(prepared)
 
     def update_status(self):
-        self.status.config(text=f"Level {self.level} | Size: {self.w}x{self.h}")
+        m = self.model
+        if m.endless:
+            depth = max(m.p1.y, m.p2.y)
+            self.status.config(text=f"Endless | Width: {m.w} | Depth: {depth}")
+            return
+        self.status.config(text=f"Level {m.level} | Size: {m.w}x{m.h}")
+
+    def screen_size(self):
+        """Cells across and down the screen."""
+        rows = self.endless_rows if self.model.endless else self.view_rows
+        return min(self.model.w, self.view_cols), min(self.model.h, rows)
+
+    def drawn_cols(self):
+        """Columns on screen."""
+        return range(self.view_left, self.view_left + self.screen_size()[0])
+
+    def drawn_rows(self):
+        """Rows on screen."""
+        return range(self.view_top, self.view_top + self.screen_size()[1])
+
+    def on_screen(self, x, y):
+        return x in self.drawn_cols() and y in self.drawn_rows()
+
+    def revealed_on_screen(self):
+        """Set of the revealed cells on screen, from the revealed row masks cut to the screen columns."""
+        revealed = self.model.revealed_cells
+        cols = self.drawn_cols()
+        window = ((1 << len(cols)) - 1) << cols.start
+        return set(mask_cells([(y, revealed.row(y) & window) for y in self.drawn_rows()]))
+
+    def follow_players(self):
+        """
+        Move the camera when a player nears the edge of the screen,
+        see camera_start(). When the players are too far apart to both
+        stay well inside the screen, it sticks with whichever is nearer the
+        middle, rather than jumping between them.
+        """
+        cols, rows = self.screen_size()
+        a, b = self.model.p1, self.model.p2
+        if abs(a.x - b.x) > cols // 2 or abs(a.y - b.y) > rows // 2:
+            mx, my = self.view_left + cols // 2, self.view_top + rows // 2
+            a = b = min(a, b, key=lambda p: abs(p.x - mx) + abs(p.y - my))
+        self.view_left = camera_start(self.view_left, cols, a.x, b.x, 0, self.model.w)
+        self.view_top = camera_start(self.view_top, rows, a.y, b.y, self.model.top_row(), self.model.h)
 
     # -----------------------
     # Apple HUD
@@ -264,8 +306,8 @@ class TwoPlayerMazeGame:
     def update_apples_hud(self):
         # show up to 5 outlines; only first apple_target are "active"
         for i, c in enumerate(self.apple_canvases):
-            if i < self.apple_target:
-                filled = (i < self.apples_collected)
+            if i < self.model.apple_target:
+                filled = (i < self.model.apples_collected)
                 self.draw_apple_icon(c, filled=filled)
                 c.configure(state="normal")
             else:
@@ -276,8 +318,8 @@ class TwoPlayerMazeGame:
     # -----------------------
 
     def cell_to_pixels(self, x, y):
-        x0 = self.margin + x * self.cell
-        y0 = self.margin + y * self.cell
+        x0 = self.margin + (x - self.view_left) * self.cell
+        y0 = self.margin + (y - self.view_top) * self.cell
         x1 = x0 + self.cell
         y1 = y0 + self.cell
         return x0, y0, x1, y1
@@ -286,121 +328,153 @@ class TwoPlayerMazeGame:
         x0, y0, x1, y1 = self.cell_to_pixels(x, y)
         return (x0 + x1) / 2, (y0 + y1) / 2
 
-    # -----------------------
-    # Visibility model
-    # -----------------------
-
-    def visible_cells_los(self, x, y):
-        visible = {(x, y)}
-        for d, (dx, dy) in DIRS.items():
-            cx, cy = x, y
-            while True:
-                if self.walls[cy][cx][d]:
-                    break
-                nx, ny = cx + dx, cy + dy
-                if not (0 <= nx < self.w and 0 <= ny < self.h):
-                    break
-                visible.add((nx, ny))
-                cx, cy = nx, ny
-        return visible
-
-    def neighbors_open(self, x, y):
-        for d, (dx, dy) in DIRS.items():
-            if not self.walls[y][x][d]:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.w and 0 <= ny < self.h:
-                    yield nx, ny
-
-    def expand_peek(self, seeds, radius):
-        if radius <= 0:
-            return set(seeds)
-
-        seen = set(seeds)
-        q = deque((cell, 0) for cell in seeds)
-        while q:
-            (x, y), dist = q.popleft()
-            if dist == radius:
-                continue
-            for nx, ny in self.neighbors_open(x, y):
-                if (nx, ny) not in seen:
-                    seen.add((nx, ny))
-                    q.append(((nx, ny), dist + 1))
-        return seen
-
-    def update_visibility(self):
-        peek = int(self.peek_var.get())
-        v = set()
-        v |= self.expand_peek(self.visible_cells_los(self.p1.x, self.p1.y), peek)
-        v |= self.expand_peek(self.visible_cells_los(self.p2.x, self.p2.y), peek)
-        for cell in v:
-            self.revealed_cells.add(cell)
-
     # -----------------------
     # Drawing
     # -----------------------
 
     def redraw_world(self):
+        """
+        Repaint everything on screen from scratch. Used when a level is built
+        or the camera moves; a plain move goes through refresh_world(),
+        and toggling glass through show_static_layer() + redraw_dynamic().
+
+        Layers, bottom to top:
+          - fog: revealed floor + spill ("floor") and walls ("wall")
+          - glass: every wall, made the first time glass is shown ("glass")
+          - dynamic: goal, apples, trails, players ("dynamic")
+        Only one of fog and glass is shown at a time.
+        """
+        self.canvas.delete("all")
+        self.draw_revealed_map_white_floor_black_walls(self.revealed_on_screen())
+        self.glass_drawn = False
+        self.show_static_layer()
+        self.redraw_dynamic()
+        self.drawn_view = (self.view_left, self.view_top)
+
+    def show_static_layer(self):
+        """Show the fog or the glass walls layer, whichever the checkbox says."""
         glass = self.glass_var.get()
-
-        if glass:
-            self.canvas.config(bg="white")
-            self.canvas.delete("all")
+        if glass and not self.glass_drawn:
             self.draw_full_maze_black_on_white()
+            self.canvas.tag_lower("glass")
+            self.glass_drawn = True
+        self.canvas.config(bg="white" if glass else "black")
+        fog_state, glass_state = ("hidden", "normal") if glass else ("normal", "hidden")
+        self.canvas.itemconfigure("floor", state=fog_state)
+        self.canvas.itemconfigure("wall", state=fog_state)
+        self.canvas.itemconfigure("glass", state=glass_state)
+
+    def redraw_dynamic(self):
+        """Remake the goal, apple, trail and player items; a few dozen at most."""
+        glass = self.glass_var.get()
+        self.canvas.delete("dynamic")
+        if glass:
             self.draw_goal_full()
-            self.draw_apples(glass_mode=True)
-            self.draw_trails()
-            self.draw_players()
         else:
-            self.canvas.config(bg="black")
-            self.canvas.delete("all")
-            self.draw_revealed_map_white_floor_black_walls()
             self.draw_goal_fog()
-            self.draw_apples(glass_mode=False)
-            self.draw_trails()
-            self.draw_players()
+        self.apple_items = {}
+        self.draw_apples(glass_mode=glass)
+        self.create_trails()
+        self.create_players()
+
+    def refresh_world(self, new_cells):
+        """
+        Per-move update: add items for the newly revealed cells only,
+        then move the trail and player items. Nothing already drawn is redone,
+        so the cost does not grow as the map opens up.
+        """
+        if (self.view_left, self.view_top) != self.drawn_view:
+            self.redraw_world()
+            return
+
+        if new_cells:
+            # Fog cells are drawn under glass too (hidden), so toggling back is instant
+            self.draw_revealed_map_white_floor_black_walls(new_cells)
+            # Keep the stacking of a full redraw: floor + spill, walls, then the rest
+            self.canvas.tag_lower("wall")
+            self.canvas.tag_lower("floor")
+            if not self.glass_var.get():
+                if (self.model.goal_x, self.model.goal_y) in new_cells:
+                    self.draw_goal_fog()
+                self.draw_apples(glass_mode=False, cells=new_cells)
+                self.canvas.tag_raise("trail")
+                self.canvas.tag_raise("player")
+
+        self.update_trails()
+        self.position_players()
 
     def draw_full_maze_black_on_white(self):
-        for y in range(self.h):
-            for x in range(self.w):
-                x0, y0, x1, y1 = self.cell_to_pixels(x, y)
-                w = self.walls[y][x]
-                if w["N"]:
-                    self.canvas.create_line(x0, y0, x1, y0, width=2, fill="black")
-                if w["E"]:
-                    self.canvas.create_line(x1, y0, x1, y1, width=2, fill="black")
-                if w["S"]:
-                    self.canvas.create_line(x0, y1, x1, y1, width=2, fill="black")
-                if w["W"]:
-                    self.canvas.create_line(x0, y0, x0, y1, width=2, fill="black")
+        """
+        Glass mode walls on screen, as one line per straight run of wall
+        instead of one per cell side, tagged "glass".
+        """
+        cols, rows = self.drawn_cols(), self.drawn_rows()
+        left, right = cols.start, cols.stop
+        top, bottom = rows.start, rows.stop
+        has_wall = self.model.walls.has_wall
+
+        def line(x0, y0, x1, y1):
+            px0, py0, _, _ = self.cell_to_pixels(x0, y0)
+            px1, py1, _, _ = self.cell_to_pixels(x1, y1)
+            self.canvas.create_line(px0, py0, px1, py1, width=2, fill="black", tags="glass")
+
+        # Horizontal: the line above each row, then below the last one
+        for y in range(top, bottom + 1):
+            if y < bottom:
+                runs = wall_runs(right - left, lambda i: has_wall(left + i, y, "N"))
+            else:
+                runs = wall_runs(right - left, lambda i: has_wall(left + i, y - 1, "S"))
+            for x0, x1 in runs:
+                line(left + x0, y, left + x1, y)
+
+        # Vertical: the line left of each column, then right of the last one
+        for x in range(left, right + 1):
+            if x < right:
+                runs = wall_runs(bottom - top, lambda i: has_wall(x, top + i, "W"))
+            else:
+                runs = wall_runs(bottom - top, lambda i: has_wall(x - 1, top + i, "E"))
+            for y0, y1 in runs:
+                line(x, top + y0, x, top + y1)
 
     def draw_goal_full(self):
-        x0, y0, x1, y1 = self.cell_to_pixels(self.goal_x, self.goal_y)
+        if self.model.goal_x is None or not self.on_screen(self.model.goal_x, self.model.goal_y):
+            return
+        x0, y0, x1, y1 = self.cell_to_pixels(self.model.goal_x, self.model.goal_y)
         self.canvas.create_rectangle(
             x0 + 3, y0 + 3, x1 - 3, y1 - 3,
-            outline="black", width=2, fill="#ffd54d"
+            outline="black", width=2, fill="#ffd54d", tags="dynamic"
         )
         self.canvas.create_text((x0 + x1) / 2, (y0 + y1) / 2, text="★",
-                                font=("Arial", 14, "bold"), fill="black")
+                                font=("Arial", 14, "bold"), fill="black", tags="dynamic")
 
     def draw_goal_fog(self):
-        if (self.goal_x, self.goal_y) not in self.revealed_cells:
+        if self.model.goal_x is None:
+            return
+        if (self.model.goal_x, self.model.goal_y) not in self.model.revealed_cells:
+            return
+        if not self.on_screen(self.model.goal_x, self.model.goal_y):
             return
-        x0, y0, x1, y1 = self.cell_to_pixels(self.goal_x, self.goal_y)
+        x0, y0, x1, y1 = self.cell_to_pixels(self.model.goal_x, self.model.goal_y)
         self.canvas.create_rectangle(
             x0 + 3, y0 + 3, x1 - 3, y1 - 3,
-            outline="black", width=2, fill="#ffd54d"
+            outline="black", width=2, fill="#ffd54d", tags="dynamic"
         )
         self.canvas.create_text((x0 + x1) / 2, (y0 + y1) / 2, text="★",
-                                font=("Arial", 14, "bold"), fill="black")
+                                font=("Arial", 14, "bold"), fill="black", tags="dynamic")
 
-    def draw_apples(self, glass_mode: bool):
+    def draw_apples(self, glass_mode: bool, cells=None):
         """
         Draw apples:
           - Glass mode: all uncollected apples visible.
           - Fog mode: only visible if the cell is revealed.
+        cells limits it to apples in those cells. Off-screen apples are skipped.
+        Item ids go in apple_items, so a collected apple can be deleted.
         """
-        for (ax, ay) in self.apples:
-            if not glass_mode and (ax, ay) not in self.revealed_cells:
+        apples = self.model.apples if cells is None else self.model.apples & cells
+        for (ax, ay) in apples:
+            if not glass_mode and (ax, ay) not in self.model.revealed_cells:
+                continue
+            if not self.on_screen(ax, ay):
                 continue
 
             x0, y0, x1, y1 = self.cell_to_pixels(ax, ay)
@@ -408,131 +482,243 @@ class TwoPlayerMazeGame:
             r = self.cell * 0.18
 
             # red apple body + green leaf
-            self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r, fill="#d64545", outline="black", width=1)
-            self.canvas.create_oval(cx + r * 0.2, cy - r * 1.1, cx + r * 1.2, cy - r * 0.2,
-                                    fill="#3aa655", outline="black", width=1)
+            body = self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r,
+                                           fill="#d64545", outline="black", width=1, tags="dynamic")
+            leaf = self.canvas.create_oval(cx + r * 0.2, cy - r * 1.1, cx + r * 1.2, cy - r * 0.2,
+                                           fill="#3aa655", outline="black", width=1, tags="dynamic")
+            self.apple_items[(ax, ay)] = (body, leaf)
 
-    def draw_revealed_map_white_floor_black_walls(self):
+    def draw_revealed_map_white_floor_black_walls(self, cells):
         """
-        Fog mode:
+        Fog mode, for the given set of revealed cells (all of them, or just
+        the new ones), skipping those off screen:
         - revealed cells: white floor
         - door spill: very wide (90% cell width) and medium depth (half a cell)
         - walls: black, thin, drawn once per segment (maze-like)
+        Floor and spill items are tagged "floor", walls "wall", and made
+        hidden while the glass layer is shown.
         """
+        state = "hidden" if self.glass_var.get() else "normal"
         spill_depth = int(self.cell * 0.35)            # half-cell depth outward
         door_half = int(self.cell * 0.48)              # 90% total width (0.45 each side)
         wall_w = 2
 
+        cols, rows = self.drawn_cols(), self.drawn_rows()
+        shown = [(x, y) for (x, y) in cells if x in cols and y in rows]
+
         # 1) Paint revealed floor
-        for (x, y) in self.revealed_cells:
+        for (x, y) in shown:
             x0, y0, x1, y1 = self.cell_to_pixels(x, y)
-            self.canvas.create_rectangle(x0, y0, x1, y1, outline="", fill="white")
+            self.canvas.create_rectangle(x0, y0, x1, y1, outline="", fill="white", tags="floor", state=state)
 
         # 2) Door spill: curved "light" bulb through openings
-        for (x, y) in self.revealed_cells:
+        for (x, y) in shown:
             x0, y0, x1, y1 = self.cell_to_pixels(x, y)
-            w = self.walls[y][x]
+            w = self.model.walls[y][x]
             cx, cy = (x0 + x1) // 2, (y0 + y1) // 2
 
             # We keep the oval straddling the doorway boundary, but make it MUCH wider.
             # Depth is half-cell outward; a bit of "inward" overlap (depth/2) makes it feel continuous.
             inward = spill_depth // 2
 
-            if not w["N"] and y > 0:
+            if not w["N"] and y > self.model.top_row():
                 self.canvas.create_oval(
                     cx - door_half, y0 - spill_depth,
                     cx + door_half, y0 + inward,
-                    fill="white", outline=""
+                    fill="white", outline="", tags="floor", state=state
                 )
-            if not w["S"] and y < self.h - 1:
+            if not w["S"] and y < self.model.h - 1:
                 self.canvas.create_oval(
                     cx - door_half, y1 - inward,
                     cx + door_half, y1 + spill_depth,
-                    fill="white", outline=""
+                    fill="white", outline="", tags="floor", state=state
                 )
             if not w["W"] and x > 0:
                 self.canvas.create_oval(
                     x0 - spill_depth, cy - door_half,
                     x0 + inward,      cy + door_half,
-                    fill="white", outline=""
+                    fill="white", outline="", tags="floor", state=state
                 )
-            if not w["E"] and x < self.w - 1:
+            if not w["E"] and x < self.model.w - 1:
                 self.canvas.create_oval(
                     x1 - inward,      cy - door_half,
                     x1 + spill_depth, cy + door_half,
-                    fill="white", outline=""
+                    fill="white", outline="", tags="floor", state=state
                 )
 
         def is_revealed(xx, yy):
-            return (xx, yy) in self.revealed_cells
+            # Off-screen cells draw nothing, so they count as not revealed
+            return (xx, yy) in self.model.revealed_cells and xx in cols and yy in rows
+
+        def drawn_before(xx, yy):
+            # Revealed by an earlier call, which drew its E/S walls towards us
+            return is_revealed(xx, yy) and (xx, yy) not in cells
 
         # 3) Walls drawn ONCE per segment (thin maze lines)
-        for (x, y) in self.revealed_cells:
+        for (x, y) in shown:
             x0, y0, x1, y1 = self.cell_to_pixels(x, y)
-            w = self.walls[y][x]
+            w = self.model.walls[y][x]
 
-            # North + West always
-            if w["N"]:
-                self.canvas.create_line(x0, y0, x1, y0, width=wall_w, fill="black")
-            if w["W"]:
-                self.canvas.create_line(x0, y0, x0, y1, width=wall_w, fill="black")
+            # North + West unless that neighbor already drew them
+            if w["N"] and not drawn_before(x, y - 1):
+                self.canvas.create_line(x0, y0, x1, y0, width=wall_w, fill="black", tags="wall", state=state)
+            if w["W"] and not drawn_before(x - 1, y):
+                self.canvas.create_line(x0, y0, x0, y1, width=wall_w, fill="black", tags="wall", state=state)
 
             # East only if neighbor not revealed or boundary
             if w["E"]:
-                if x == self.w - 1 or not is_revealed(x + 1, y):
-                    self.canvas.create_line(x1, y0, x1, y1, width=wall_w, fill="black")
+                if x == self.model.w - 1 or not is_revealed(x + 1, y):
+                    self.canvas.create_line(x1, y0, x1, y1, width=wall_w, fill="black", tags="wall", state=state)
 
             # South only if neighbor not revealed or boundary
             if w["S"]:
-                if y == self.h - 1 or not is_revealed(x, y + 1):
-                    self.canvas.create_line(x0, y1, x1, y1, width=wall_w, fill="black")
+                if y == self.model.h - 1 or not is_revealed(x, y + 1):
+                    self.canvas.create_line(x0, y1, x1, y1, width=wall_w, fill="black", tags="wall", state=state)
 
     # -----------------------
     # Trails + players
     # -----------------------
 
-    def ensure_trails_initialized(self):
-        if not self.p1.trail_points:
-            self.p1.trail_points = [self.cell_center(self.p1.x, self.p1.y)]
-        if not self.p2.trail_points:
-            self.p2.trail_points = [self.cell_center(self.p2.x, self.p2.y)]
-
-    def extend_trail(self, p):
-        cx, cy = self.cell_center(p.x, p.y)
-        if p.trail_points and (cx, cy) == p.trail_points[-1]:
-            return
-        p.trail_points.append((cx, cy))
-
-    def draw_trails(self):
-        self.draw_polyline(self.p1.trail_points, self.p1.color)
-        self.draw_polyline(self.p2.trail_points, self.p2.color)
-
-    def draw_polyline(self, points, color):
-        if not points:
-            return
+    # Trail strokes are cells, turned into pixels when drawn,
+    # since the camera moves.
+    # Each player has trail line items, one per stretch of stroke on screen,
+    # and one oval item, made in redraw_world(). After that a move only
+    # adds points to the line of the stroke being walked (PlayerItems.tail) or
+    # makes a line for a new stroke, so it costs the same however long the trail.
+    # Those are clipped to the screen like the rest, so a player walking off
+    # it while the camera stays does not leave items behind.
+
+    def create_trails(self):
+        for p in (self.model.p1, self.model.p2):
+            self.draw_trail(p)
+
+    def draw_trail(self, p):
+        """Make p's trail line items from scratch, for the strokes on screen."""
+        items = self.player_items[p.name]
+        for item in items.trails:
+            self.canvas.delete(item)
+        items.trails = []
+        items.tail = (None, None, 0, -1, None)
+        for stroke in p.trail:
+            for first, last in self.trail_runs(stroke):
+                item = self.create_trail_line(p, stroke[first:last + 1])
+                if stroke is p.trail[-1] and last == len(stroke) - 1:
+                    items.tail = (item, stroke, first, last, stroke[last])
+        if p.trail and items.tail[0] is None:
+            stroke = p.trail[-1]
+            items.tail = (None, stroke, 0, len(stroke) - 1, stroke[-1])
+
+    def update_trails(self):
+        """Bring the trail items up to date with the players' trails after moves."""
+        for p in (self.model.p1, self.model.p2):
+            items = self.player_items[p.name]
+            item, stroke, first, done, end = items.tail
+            trail = p.trail
+            if trail and trail[-1] is stroke and len(stroke) - 1 == done and stroke[done] == end:
+                continue
+            k = len(trail) - 1
+            while k >= 0 and trail[k] is not stroke:
+                k -= 1
+            if k < 0:
+                # Nothing drawn yet, or the stroke dropped with the endless rows above
+                self.draw_trail(p)
+                continue
+            if len(stroke) - 1 != done or stroke[done] != end:
+                if item is None:
+                    # The tail is off the screen; its last step may have grown onto it
+                    self.add_trail_lines(p, stroke, max(done - 1, 0))
+                else:
+                    runs = self.trail_runs(stroke[done:])
+                    last = done + runs[0][1] if runs and runs[0][0] == 0 else done
+                    if last > done or stroke[done] != end:
+                        # The last point drawn may have moved along a straight run,
+                        # so add from it on, then delete the old copy of it
+                        keep = done - first
+                        self.canvas.insert(item, "end", self.trail_coords(stroke[done:last + 1]))
+                        self.canvas.dchars(item, 2 * keep, 2 * max(keep + 1, 2) - 1)
+                    if last == len(stroke) - 1:
+                        items.tail = (item, stroke, first, last, stroke[last])
+                    else:
+                        # Walked off the screen: the rest is drawn as it comes back on
+                        self.add_trail_lines(p, stroke, last)
+            for s in trail[k + 1:]:
+                self.add_trail_lines(p, s, 0)
+
+    def add_trail_lines(self, p, stroke, start):
+        """
+        Make line items for the stretches of stroke from index start on that
+        are on screen, and make the one reaching its end p's tail; with none
+        there, only remember how far the stroke went, for the next move.
+        """
+        items = self.player_items[p.name]
+        items.tail = (None, stroke, 0, len(stroke) - 1, stroke[-1])
+        for first, last in self.trail_runs(stroke[start:]):
+            item = self.create_trail_line(p, stroke[start + first:start + last + 1])
+            if start + last == len(stroke) - 1:
+                items.tail = (item, stroke, start + first, start + last, stroke[-1])
+
+    def create_trail_line(self, p, points):
+        coords = self.trail_coords(points)
+        if len(coords) == 2:
+            # A line needs two points, make a dot
+            coords.extend([coords[0] + 0.001, coords[1] + 0.001])
+        item = self.canvas.create_line(
+            *coords, width=2, fill=p.color, tags=("trail", "dynamic"),
+            capstyle="round", joinstyle="round")
+        self.canvas.tag_raise("player")
+        self.player_items[p.name].trails.append(item)
+        return item
+
+    def trail_coords(self, points):
+        """Pixel coordinates of the centers of the cells in points."""
         coords = []
-        for (px, py) in points:
-            coords.extend([px, py])
-        if len(points) == 1:
-            coords.extend([points[0][0] + 0.001, points[0][1] + 0.001])
-        self.canvas.create_line(*coords, width=2, fill=color, capstyle="round", joinstyle="round")
+        for (x, y) in points:
+            coords.extend(self.cell_center(x, y))
+        return coords
 
-    def draw_players(self):
+    def trail_runs(self, stroke):
+        """
+        (first, last) index pairs of the stretches of stroke on screen,
+        each taking in one cell past the edge, so lines run off the screen
+        instead of stopping short.
+        """
+        cols, rows = self.drawn_cols(), self.drawn_rows()
+        x_lo, x_hi = cols.start - 1, cols.stop
+        y_lo, y_hi = rows.start - 1, rows.stop
+        if len(stroke) == 1:
+            x, y = stroke[0]
+            return [(0, 0)] if x_lo <= x <= x_hi and y_lo <= y <= y_hi else []
+        runs = []
+        for k in range(len(stroke) - 1):
+            (ax, ay), (bx, by) = stroke[k], stroke[k + 1]
+            # Steps are straight, so one crossing the screen has its box on it
+            if min(ax, bx) <= x_hi and max(ax, bx) >= x_lo and min(ay, by) <= y_hi and max(ay, by) >= y_lo:
+                if runs and runs[-1][1] == k:
+                    runs[-1] = (runs[-1][0], k + 1)
+                else:
+                    runs.append((k, k + 1))
+        return runs
+
+    def create_players(self):
         outline = "black"
-        p1_id = self.canvas.create_oval(0, 0, 0, 0, fill=self.p1.color, outline=outline, width=1)
-        p2_id = self.canvas.create_oval(0, 0, 0, 0, fill=self.p2.color, outline=outline, width=1)
-
-        same = (self.p1.x == self.p2.x and self.p1.y == self.p2.y)
+        for p in (self.model.p1, self.model.p2):
+            self.player_items[p.name].oval = self.canvas.create_oval(0, 0, 0, 0, fill=p.color, outline=outline,
+                                                                     width=1, tags=("player", "dynamic"))
+        self.position_players()
+
+    def position_players(self):
+        p1_id, p2_id = self.player_items["P1"].oval, self.player_items["P2"].oval
+        same = (self.model.p1.x == self.model.p2.x and self.model.p1.y == self.model.p2.y)
         if same:
-            x0, y0, x1, y1 = self.cell_to_pixels(self.p1.x, self.p1.y)
+            x0, y0, x1, y1 = self.cell_to_pixels(self.model.p1.x, self.model.p1.y)
             cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
             r = self.cell * 0.23
             offset = self.cell * 0.18
             self.canvas.coords(p1_id, cx - offset - r, cy - r, cx - offset + r, cy + r)
             self.canvas.coords(p2_id, cx + offset - r, cy - r, cx + offset + r, cy + r)
         else:
-            self.position_player_normal(p1_id, self.p1.x, self.p1.y)
-            self.position_player_normal(p2_id, self.p2.x, self.p2.y)
+            self.position_player_normal(p1_id, self.model.p1.x, self.model.p1.y)
+            self.position_player_normal(p2_id, self.model.p2.x, self.model.p2.y)
 
     def position_player_normal(self, oid, x, y):
         x0, y0, x1, y1 = self.cell_to_pixels(x, y)
@@ -544,57 +730,70 @@ class TwoPlayerMazeGame:
     # -----------------------
 
     def on_toggle_glass(self):
-        self.redraw_world()
+        self.show_static_layer()
+        self.redraw_dynamic()
+
+    def on_toggle_endless(self):
+        self.model.endless = bool(self.endless_var.get())
+        self.build_level()
 
     def on_peek_change(self):
-        self.update_visibility()
-        self.redraw_world()
+        self.model.peek = int(self.peek_var.get())
+        self.refresh_world(self.model.update_visibility())
 
     # -----------------------
     # Movement + apples
     # -----------------------
 
-    def can_move(self, x, y, direction):
-        if self.walls[y][x][direction]:
-            return False
-        dx, dy = DIRS[direction]
-        nx, ny = x + dx, y + dy
-        return 0 <= nx < self.w and 0 <= ny < self.h
+    def show_hints(self):
+        arrows = {"N": "↑", "E": "→", "S": "↓", "W": "←", None: "·"}
+        m = self.model
+        self.message.config(text="Hint:  " + "   ".join(
+            f"{p.name} {arrows[m.hint(p)]}" for p in (m.p1, m.p2)))
 
-    def check_apple_collect(self):
+    def try_move(self, player, direction):
+        """Move player now; keys go through queue_move() instead."""
+        self.apply_moves([(player, direction)])
+
+    def apply_moves(self, moves):
         """
-        If either player is on an apple, collect it.
+        Make moves, (player, direction) pairs, in order, stopping at a win,
+        then move the camera and draw what changed once for all of them.
+        Each move still reveals and collects what it passes, as on its own.
         """
-        for pos in [(self.p1.x, self.p1.y), (self.p2.x, self.p2.y)]:
-            if pos in self.apples:
-                self.apples.remove(pos)
-                self.apples_collected += 1
-                self.update_apples_hud()
-
-    def try_move(self, player, direction):
-        if not self.can_move(player.x, player.y, direction):
+        m = self.model
+        new_cells, eaten, winner, moved = set(), [], None, False
+        for player, direction in moves:
+            result = m.try_move(player, direction)
+            if result is None:
+                continue
+            moved = True
+            new_cells |= result.new_cells
+            eaten += result.eaten
+            if result.won:
+                winner = player
+                break
+        if not moved:
             return
 
-        self.ensure_trails_initialized()
+        self.follow_players()
+        if m.endless:
+            self.update_status()
+            # Rows may have been dropped since an earlier move revealed them
+            top = m.top_row()
+            new_cells = {(x, y) for (x, y) in new_cells if y >= top}
 
-        dx, dy = DIRS[direction]
-        player.x += dx
-        player.y += dy
+        for pos in eaten:
+            for item in self.apple_items.pop(pos, ()):
+                self.canvas.delete(item)
+        if eaten:
+            self.update_apples_hud()
 
-        self.extend_trail(player)
+        # Draw what changed
+        self.refresh_world(new_cells)
 
-        # Update reveal (collaborative)
-        self.update_visibility()
-
-        # Collect apples (collaborative)
-        self.check_apple_collect()
-
-        # Redraw
-        self.redraw_world()
-
-        # Win condition
-        if player.x == self.goal_x and player.y == self.goal_y:
-            self.next_level(player.name)
+        if winner is not None:
+            self.next_level(winner.name)
 
     # -----------------------
     # Input
@@ -603,30 +802,50 @@ class TwoPlayerMazeGame:
     def on_key(self, event):
         key = event.keysym
 
-        # Player 1 (WASD)
-        if key in ("w", "W"):
-            self.try_move(self.p1, "N")
-        elif key in ("d", "D"):
-            self.try_move(self.p1, "E")
-        elif key in ("s", "S"):
-            self.try_move(self.p1, "S")
-        elif key in ("a", "A"):
-            self.try_move(self.p1, "W")
-
-        # Player 2 (Arrows)
-        elif key == "Up":
-            self.try_move(self.p2, "N")
-        elif key == "Right":
-            self.try_move(self.p2, "E")
-        elif key == "Down":
-            self.try_move(self.p2, "S")
-        elif key == "Left":
-            self.try_move(self.p2, "W")
+        # Player 1 (WASD), player 2 (arrows)
+        move = KEY_MOVES.get(key) or KEY_MOVES.get(key.lower())
+        if move:
+            self.queue_move(*move)
+
+        # Either player: hint towards the nearest apple, then the goal
+        elif key in ("h", "H"):
+            self.show_hints()
+
+    def queue_move(self, name, direction):
+        """
+        Hold a move for player name ("p1" or "p2") until the next tick.
+        Key repeat past max_moves_per_tick waiting moves for a player is
+        dropped, so a slow screen never falls behind the keys.
+        """
+        waiting = sum(1 for n, _ in self.pending_moves if n == name)
+        if waiting < self.max_moves_per_tick:
+            self.pending_moves.append((name, direction))
+        if not self.tick_pending:
+            self.tick_pending = True
+            self.root.after(self.tick_ms, self.tick)
+
+    def tick(self):
+        """Make the moves keyed in since the last tick, drawing once."""
+        self.tick_pending = False
+        moves = [(getattr(self.model, name), d) for name, d in self.pending_moves]
+        self.pending_moves.clear()
+        self.apply_moves(moves)
 
 
 def main():
+    """
+    python maze.py [width height | PACK]
+    With a size, every level is a width x height maze, as big as you like;
+    the screen scrolls to follow the players.
+    With a level pack file (see maze_pack.py), its levels are played in order.
+    """
+    args = sys.argv[1:]
+    size = (int(args[0]), int(args[1])) if len(args) >= 2 else None
+    pack = LevelPack(args[0]) if len(args) == 1 else None
+    if pack is not None and not len(pack):
+        print(f"{args[0]}: no levels in the pack, making mazes instead")
     root = tk.Tk()
-    TwoPlayerMazeGame(root)
+    TwoPlayerMazeGame(root, size, pack)
     root.mainloop()
 
 
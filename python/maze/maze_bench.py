@@ -0,0 +1,60 @@
+"""
+Scaling benchmark for the maze generators in maze_gen.GENERATORS.
+
+    python maze_bench.py [max_size] [algorithm ...]
+
+For each algorithm and each square size from 10 up to max_size (default 2000),
+reports generation time, peak memory while generating, dead ends, and the
+solution length from the top-left to the bottom-right corner.
+"""
+import sys
+import time
+import tracemalloc
+
+from maze_gen import GENERATORS, bfs_distances, count_dead_ends
+
+SIZES = [10, 50, 100, 250, 500, 1000, 2000]
+
+
+def bench_one(name, size, seed=1):
+    gen = GENERATORS[name]
+
+    t0 = time.perf_counter()
+    walls = gen(size, size, seed)
+    seconds = time.perf_counter() - t0
+
+    # Separate traced run, tracemalloc slows things down too much to time with
+    tracemalloc.start()
+    gen(size, size, seed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    dist = bfs_distances(walls, 0)
+    return {
+        "algorithm": name,
+        "size": size,
+        "seconds": seconds,
+        "peak_mb": peak / 1e6,
+        "dead_ends": count_dead_ends(walls),
+        "solution": dist[-1],
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    max_size = int(args[0]) if args else SIZES[-1]
+    names = args[1:] or list(GENERATORS)
+
+    print(f"{'algorithm':<12}{'size':>6}{'seconds':>10}{'cells/s':>12}{'peak MB':>10}"
+          f"{'dead ends':>11}{'dead %':>8}{'solution':>10}")
+    for name in names:
+        for size in [s for s in SIZES if s <= max_size]:
+            r = bench_one(name, size)
+            cells = size * size
+            print(f"{name:<12}{size:>6}{r['seconds']:>10.3f}{cells / max(r['seconds'], 1e-9):>12.0f}"
+                  f"{r['peak_mb']:>10.1f}{r['dead_ends']:>11}{100 * r['dead_ends'] / cells:>8.1f}"
+                  f"{r['solution']:>10}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,734 @@
+import random
+from collections import deque
+
+DIRS = {
+    "N": (0, -1),
+    "E": (1, 0),
+    "S": (0, 1),
+    "W": (-1, 0),
+}
+OPP = {"N": "S", "S": "N", "E": "W", "W": "E"}
+
+# Wall bit for each direction in a cell's 4-bit mask
+BIT = {"N": 1, "E": 2, "S": 4, "W": 8}
+ALL_WALLS = 15
+
+# Direction codes 0..3 in N, E, S, W order, for the flat-array loops
+DIR_NAMES = ("N", "E", "S", "W")
+DIR_BITS = (1, 2, 4, 8)
+OPP_BITS = (4, 8, 1, 2)
+
+
+class WallGrid:
+    """
+    Maze walls stored as one 4-bit mask per cell (BIT values) in a flat
+    bytearray, cell (x, y) at index y * w + x.
+
+    walls[y][x]["N"] reads and writes like the nested dicts from
+    generate_maze_prim(), so code written for those keeps working.
+    """
+    __slots__ = ("w", "h", "cells")
+
+    def __init__(self, w, h, cells=None):
+        self.w = w
+        self.h = h
+        self.cells = cells if cells is not None else bytearray([ALL_WALLS]) * (w * h)
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.h:
+            raise IndexError(y)
+        return WallRow(self.cells, y * self.w, self.w)
+
+    def __len__(self):
+        return self.h
+
+    def __iter__(self):
+        for y in range(self.h):
+            yield self[y]
+
+    def __eq__(self, other):
+        if isinstance(other, WallGrid):
+            return (self.w, self.h, self.cells) == (other.w, other.h, other.cells)
+        return NotImplemented
+
+    def has_wall(self, x, y, d):
+        return bool(self.cells[y * self.w + x] & BIT[d])
+
+    def open_passage(self, x, y, d):
+        """Remove the wall on side d of (x, y) and the matching wall of its neighbor."""
+        dx, dy = DIRS[d]
+        self.cells[y * self.w + x] &= ~BIT[d]
+        self.cells[(y + dy) * self.w + x + dx] &= ~BIT[OPP[d]]
+
+    def to_dicts(self):
+        """Nested dict-of-booleans form, as generate_maze_prim() returns."""
+        return [[{d: bool(m & BIT[d]) for d in DIR_NAMES}
+                 for m in self.cells[y * self.w:(y + 1) * self.w]]
+                for y in range(self.h)]
+
+    @staticmethod
+    def from_dicts(walls):
+        h = len(walls)
+        w = len(walls[0])
+        grid = WallGrid(w, h, bytearray(w * h))
+        for y, row in enumerate(walls):
+            for x, cell in enumerate(row):
+                grid.cells[y * w + x] = sum(BIT[d] for d in DIR_NAMES if cell[d])
+        return grid
+
+
+class WallRow:
+    """One row of a WallGrid, indexed by x."""
+    __slots__ = ("cells", "start", "w")
+
+    def __init__(self, cells, start, w):
+        self.cells = cells
+        self.start = start
+        self.w = w
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.w:
+            raise IndexError(x)
+        return WallCell(self.cells, self.start + x)
+
+    def __len__(self):
+        return self.w
+
+
+class WallCell:
+    """One cell of a WallGrid, a live view: cell["N"] is True if walled."""
+    __slots__ = ("cells", "i")
+
+    def __init__(self, cells, i):
+        self.cells = cells
+        self.i = i
+
+    def __getitem__(self, d):
+        return bool(self.cells[self.i] & BIT[d])
+
+    def __setitem__(self, d, walled):
+        if walled:
+            self.cells[self.i] |= BIT[d]
+        else:
+            self.cells[self.i] &= ~BIT[d]
+
+    def keys(self):
+        return DIR_NAMES
+
+    def items(self):
+        return [(d, self[d]) for d in DIR_NAMES]
+
+    def __eq__(self, other):
+        return dict(self.items()) == dict(other.items())
+
+
+def generate_maze_prim(w, h, seed=None):
+    """
+    Perfect maze (unique solution) using randomized Prim's algorithm on a grid.
+    Produces lots of branching and short dead ends.
+    The original nested-dict version, kept as the reference for
+    generate_maze_prim_fast(), which the game uses.
+    """
+    rng = random.Random(seed)
+
+    walls = [[{"N": True, "E": True, "S": True, "W": True} for _ in range(w)] for _ in range(h)]
+    in_maze = [[False for _ in range(w)] for _ in range(h)]
+    frontier = []
+
+    def add_frontier_edges(x, y):
+        for d, (dx, dy) in DIRS.items():
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < w and 0 <= ny < h and not in_maze[ny][nx]:
+                frontier.append((x, y, d))
+
+    sx, sy = rng.randrange(w), rng.randrange(h)
+    in_maze[sy][sx] = True
+    add_frontier_edges(sx, sy)
+
+    while frontier:
+        idx = rng.randrange(len(frontier))
+        x, y, d = frontier.pop(idx)
+        dx, dy = DIRS[d]
+        nx, ny = x + dx, y + dy
+        if not (0 <= nx < w and 0 <= ny < h):
+            continue
+        if in_maze[ny][nx]:
+            continue
+
+        walls[y][x][d] = False
+        walls[ny][nx][OPP[d]] = False
+
+        in_maze[ny][nx] = True
+        add_frontier_edges(nx, ny)
+
+    return walls
+
+
+def generate_maze_prim_fast(w, h, seed=None):
+    """
+    Randomized Prim's, like generate_maze_prim(), on flat arrays:
+    walls are a WallGrid and frontier edges are removed by swapping
+    the last one into the chosen slot, so each step is O(1) and
+    generation is linear in the maze area.
+
+    The start cell comes from the same random calls as generate_maze_prim(),
+    but swap-removal reorders the frontier, so for a given seed the maze
+    differs from generate_maze_prim()'s. It is drawn from the same
+    distribution: every frontier edge is still equally likely to be picked.
+    """
+    rng = random.Random(seed)
+    randrange = rng.randrange
+
+    cells = bytearray([ALL_WALLS]) * (w * h)
+    in_maze = bytearray(w * h)
+    # Edge (cell index i, direction code k) stored as i * 4 + k
+    frontier = []
+    step = (-w, 1, w, -1)
+
+    def add_frontier_edges(i):
+        x = i % w
+        if i >= w and not in_maze[i - w]:
+            frontier.append(i * 4)
+        if x < w - 1 and not in_maze[i + 1]:
+            frontier.append(i * 4 + 1)
+        if i < (h - 1) * w and not in_maze[i + w]:
+            frontier.append(i * 4 + 2)
+        if x > 0 and not in_maze[i - 1]:
+            frontier.append(i * 4 + 3)
+
+    sx, sy = randrange(w), randrange(h)
+    start = sy * w + sx
+    in_maze[start] = 1
+    add_frontier_edges(start)
+
+    while frontier:
+        idx = randrange(len(frontier))
+        edge = frontier[idx]
+        last = frontier.pop()
+        if idx < len(frontier):
+            frontier[idx] = last
+
+        i, k = edge >> 2, edge & 3
+        n = i + step[k]
+        if in_maze[n]:
+            continue
+
+        cells[i] &= ~DIR_BITS[k]
+        cells[n] &= ~OPP_BITS[k]
+
+        in_maze[n] = 1
+        add_frontier_edges(n)
+
+    return WallGrid(w, h, cells)
+
+
+# -----------------------
+# More generators, same signature: (w, h, seed=None) -> WallGrid
+# -----------------------
+
+def generate_maze_backtracker(w, h, seed=None):
+    """
+    Recursive backtracker (random depth-first search), iterative with an
+    explicit stack. Long winding corridors, few dead ends.
+    """
+    rng = random.Random(seed)
+    cells = bytearray([ALL_WALLS]) * (w * h)
+    visited = bytearray(w * h)
+    step = (-w, 1, w, -1)
+
+    start = rng.randrange(w * h)
+    visited[start] = 1
+    stack = [start]
+    while stack:
+        i = stack[-1]
+        x = i % w
+        options = []
+        if i >= w and not visited[i - w]:
+            options.append(0)
+        if x < w - 1 and not visited[i + 1]:
+            options.append(1)
+        if i < (h - 1) * w and not visited[i + w]:
+            options.append(2)
+        if x > 0 and not visited[i - 1]:
+            options.append(3)
+        if not options:
+            stack.pop()
+            continue
+        k = options[rng.randrange(len(options))]
+        n = i + step[k]
+        cells[i] &= ~DIR_BITS[k]
+        cells[n] &= ~OPP_BITS[k]
+        visited[n] = 1
+        stack.append(n)
+
+    return WallGrid(w, h, cells)
+
+
+def generate_maze_kruskal(w, h, seed=None):
+    """
+    Randomized Kruskal's: knock down walls in random order whenever the two
+    sides are not yet connected, tracked with union-find on a flat list.
+    """
+    rng = random.Random(seed)
+    cells = bytearray([ALL_WALLS]) * (w * h)
+    parent = list(range(w * h))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]  # path halving
+            i = parent[i]
+        return i
+
+    # Edge i * 4 + k for the E (k=1) and S (k=2) wall of each cell
+    edges = [i * 4 + 1 for i in range(w * h) if i % w < w - 1]
+    edges += [i * 4 + 2 for i in range(w * (h - 1))]
+    rng.shuffle(edges)
+
+    joins = w * h - 1
+    for edge in edges:
+        if not joins:
+            break
+        i, k = edge >> 2, edge & 3
+        n = i + 1 if k == 1 else i + w
+        a, b = find(i), find(n)
+        if a == b:
+            continue
+        parent[b] = a
+        cells[i] &= ~DIR_BITS[k]
+        cells[n] &= ~OPP_BITS[k]
+        joins -= 1
+
+    return WallGrid(w, h, cells)
+
+
+def generate_maze_wilson(w, h, seed=None):
+    """
+    Wilson's algorithm: loop-erased random walks, giving a uniform spanning
+    tree (every perfect maze equally likely). Slow to start on big mazes,
+    as the first walks wander a long way before hitting the maze.
+    """
+    rng = random.Random(seed)
+    randrange = rng.randrange
+    cells = bytearray([ALL_WALLS]) * (w * h)
+    in_maze = bytearray(w * h)
+    # Direction code each cell was last left by, on the current walk.
+    # Overwriting it on revisits is what erases the loops.
+    exit_dir = bytearray(w * h)
+    step = (-w, 1, w, -1)
+    last_row = (h - 1) * w
+
+    in_maze[randrange(w * h)] = 1
+    order = list(range(w * h))
+    rng.shuffle(order)
+    for start in order:
+        if in_maze[start]:
+            continue
+        # Walk until hitting the maze
+        i = start
+        while not in_maze[i]:
+            x = i % w
+            while True:
+                k = randrange(4)
+                if k == 0 and i >= w:
+                    break
+                if k == 1 and x < w - 1:
+                    break
+                if k == 2 and i < last_row:
+                    break
+                if k == 3 and x > 0:
+                    break
+            exit_dir[i] = k
+            i += step[k]
+        # Carve the loop-erased path
+        i = start
+        while not in_maze[i]:
+            k = exit_dir[i]
+            n = i + step[k]
+            cells[i] &= ~DIR_BITS[k]
+            cells[n] &= ~OPP_BITS[k]
+            in_maze[i] = 1
+            i = n
+
+    return WallGrid(w, h, cells)
+
+
+def eller_rows(w, rng, last=None):
+    """
+    Eller's algorithm, one row at a time: yields a bytearray of w wall
+    masks per row, forever, or until the last row if last is given.
+    Only the current row's sets are kept, so memory is O(w)
+    however many rows are made.
+    """
+    sets = [0] * w          # set id per cell of the current row, 0 = none yet
+    next_set = 1
+    north = bytearray(w)    # 1 where the row above opened south into this row
+    row_num = 0
+    while True:
+        final = last is not None and row_num == last
+        row = bytearray([ALL_WALLS]) * w
+        members = {}
+        for x in range(w):
+            if north[x]:
+                row[x] &= ~BIT["N"]
+            if not sets[x]:
+                sets[x] = next_set
+                next_set += 1
+            members.setdefault(sets[x], []).append(x)
+
+        # Join some neighbors in different sets, all of them on the final row
+        for x in range(w - 1):
+            a, b = sets[x], sets[x + 1]
+            if a == b or not (final or rng.randrange(2)):
+                continue
+            row[x] &= ~BIT["E"]
+            row[x + 1] &= ~BIT["W"]
+            if len(members[a]) < len(members[b]):
+                a, b = b, a
+            for m in members[b]:
+                sets[m] = a
+            members[a].extend(members.pop(b))
+
+        if final:
+            yield row
+            return
+
+        # Each set opens at least one cell down into the next row
+        north = bytearray(w)
+        for xs in members.values():
+            down = [x for x in xs if rng.randrange(2)]
+            if not down:
+                down = [xs[rng.randrange(len(xs))]]
+            for x in down:
+                north[x] = 1
+                row[x] &= ~BIT["S"]
+        sets = [sets[x] if north[x] else 0 for x in range(w)]
+
+        yield row
+        row_num += 1
+
+
+def generate_maze_eller(w, h, seed=None):
+    """
+    Eller's algorithm: builds the maze one row at a time, see eller_rows().
+    """
+    rng = random.Random(seed)
+    cells = bytearray()
+    for row in eller_rows(w, rng, last=h - 1):
+        cells += row
+    return WallGrid(w, h, cells)
+
+
+class RowWindow:
+    """
+    Endless-height maze from eller_rows(), generated as it is used.
+    Indexed by absolute row like a WallGrid, walls[y][x]["N"], and rows
+    are made on first access. discard_above(y) drops the rows above y,
+    so memory stays proportional to the rows kept, however deep play goes.
+    Rows from top to bottom - 1 are held; top moves down as rows are dropped.
+    """
+
+    def __init__(self, w, seed=None):
+        self.w = w
+        self.rows = deque()
+        self.top = 0
+        self.rows_made = eller_rows(w, random.Random(seed))
+
+    @property
+    def bottom(self):
+        return self.top + len(self.rows)
+
+    def row(self, y):
+        """Wall masks for absolute row y, generating down to it if needed."""
+        if y < self.top:
+            raise IndexError(f"row {y} was discarded, window starts at {self.top}")
+        while y >= self.bottom:
+            self.rows.append(next(self.rows_made))
+        return self.rows[y - self.top]
+
+    def __getitem__(self, y):
+        return WallRow(self.row(y), 0, self.w)
+
+    def has_wall(self, x, y, d):
+        return bool(self.row(y)[x] & BIT[d])
+
+    def discard_above(self, y):
+        """Drop rows above row y. Returns True if any were dropped."""
+        dropped = False
+        while self.top < y and self.rows:
+            self.rows.popleft()
+            self.top += 1
+            dropped = True
+        return dropped
+
+
+# Name -> generator, all called as gen(w, h, seed=None) and returning a WallGrid
+GENERATORS = {
+    "prim": generate_maze_prim_fast,
+    "backtracker": generate_maze_backtracker,
+    "kruskal": generate_maze_kruskal,
+    "wilson": generate_maze_wilson,
+    "eller": generate_maze_eller,
+}
+
+
+def generate_maze(name, w, h, seed=None):
+    """Generate a w x h maze with the named algorithm from GENERATORS."""
+    try:
+        gen = GENERATORS[name]
+    except KeyError:
+        raise ValueError(f"unknown maze generator {name!r}, choose from {sorted(GENERATORS)}")
+    return gen(w, h, seed)
+
+
+# -----------------------
+# Flat-array analysis helpers
+# -----------------------
+
+def bfs_distances(walls, start):
+    """
+    Path distance from cell index start to every cell of a WallGrid,
+    as a list indexed like walls.cells; -1 where unreachable.
+    start can also be a list of cell indices, giving the distance to the nearest.
+    """
+    w, cells = walls.w, walls.cells
+    queue = [start] if isinstance(start, int) else list(start)
+    dist = [-1] * len(cells)
+    for i in queue:
+        dist[i] = 0
+    for i in queue:  # queue grows as we go, a plain list is a fine BFS queue here
+        m = cells[i]
+        nd = dist[i] + 1
+        if not m & 1 and dist[i - w] < 0:
+            dist[i - w] = nd
+            queue.append(i - w)
+        if not m & 2 and dist[i + 1] < 0:
+            dist[i + 1] = nd
+            queue.append(i + 1)
+        if not m & 4 and dist[i + w] < 0:
+            dist[i + w] = nd
+            queue.append(i + w)
+        if not m & 8 and dist[i - 1] < 0:
+            dist[i - 1] = nd
+            queue.append(i - 1)
+    return dist
+
+
+def count_dead_ends(walls):
+    """Cells with exactly one opening."""
+    return sum(1 for m in walls.cells if m in (7, 11, 13, 14))
+
+
+def downhill(walls, dist, i):
+    """
+    Direction name to step from cell i to get one closer along a
+    bfs_distances() field, or None at a source or an unreachable cell.
+    """
+    d = dist[i]
+    if d <= 0:
+        return None
+    m, w = walls.cells[i], walls.w
+    for name, bit, step in zip(DIR_NAMES, DIR_BITS, (-w, 1, w, -1)):
+        if not m & bit and dist[i + step] == d - 1:
+            return name
+    return None
+
+
+def farthest_points(walls, count, nearest, rng=random, fields=None):
+    """
+    Pick up to count cells spread out along path distance. nearest is a
+    bfs_distances() field from the cells to keep away from (e.g. start and goal);
+    each pick is a cell farthest from those and the earlier picks, ties
+    broken by rng. Returns the picked cell indices, fewer than count if the
+    maze runs out of cells. If fields is a list, the bfs_distances() field
+    of each pick is appended to it, in the same order.
+    """
+    nearest = list(nearest)
+    picks = []
+    while len(picks) < count:
+        far = max(nearest)
+        if far <= 0:
+            break
+        i = rng.choice([i for i, d in enumerate(nearest) if d == far])
+        picks.append(i)
+        dist = bfs_distances(walls, i)
+        if fields is not None:
+            fields.append(dist)
+        nearest = [min(a, b) for a, b in zip(nearest, dist)]
+    return picks
+
+
+def mask_cells(masks):
+    """(x, y) for each bit x set in each (y, mask) of masks."""
+    for y, m in masks:
+        while m:
+            low = m & -m
+            yield low.bit_length() - 1, y
+            m ^= low
+
+
+def merge_masks(parts):
+    """Union of several tuples of (y, mask) pairs, as one such tuple."""
+    out = {}
+    for part in parts:
+        for y, m in part:
+            out[y] = out.get(y, 0) | m
+    return tuple(out.items())
+
+
+class RevealedCells:
+    """
+    A set of (x, y) cells stored as one int bitmask per row, bit x for
+    column x, with count the number of cells in it.
+    (x, y) in revealed and len(revealed) work as for a set.
+    Rows are held in a dict by y, so endless mazes work too and
+    discard_above() can drop rows.
+    >>> revealed = RevealedCells()
+    >>> sorted(revealed.reveal_masks([(0, 0b0110), (2, 0b0001)]))
+    [(0, 2), (1, 0), (2, 0)]
+    >>> sorted(revealed.reveal_masks([(0, 0b1110), (2, 0b0001)]))
+    [(3, 0)]
+    >>> len(revealed), (2, 0) in revealed, (0, 0) in revealed
+    (4, True, False)
+    >>> revealed.discard_above(1)
+    >>> len(revealed), sorted(revealed)
+    (1, [(0, 2)])
+    """
+    __slots__ = ("rows", "count")
+
+    def __init__(self):
+        self.rows = {}
+        self.count = 0
+
+    def __contains__(self, cell):
+        x, y = cell
+        return x >= 0 and (self.rows.get(y, 0) >> x) & 1 == 1
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return mask_cells(list(self.rows.items()))
+
+    def row(self, y):
+        """Bitmask of the revealed cells in row y."""
+        return self.rows.get(y, 0)
+
+    def reveal_masks(self, masks):
+        """
+        Add the cells of (y, mask) pairs, as from SightIndex.view().
+        Returns the set of cells that were not in already.
+        """
+        rows = self.rows
+        new = set()
+        for y, m in masks:
+            old = rows.get(y, 0)
+            fresh = m & ~old
+            if fresh:
+                rows[y] = old | fresh
+                self.count += bin(fresh).count("1")
+                new.update(mask_cells([(y, fresh)]))
+        return new
+
+    def reveal(self, cells):
+        """Add (x, y) cells. Returns the set of cells that were not in already."""
+        masks = {}
+        for x, y in cells:
+            masks[y] = masks.get(y, 0) | 1 << x
+        return self.reveal_masks(masks.items())
+
+    def discard_above(self, y):
+        """Drop the rows above row y."""
+        for k in [k for k in self.rows if k < y]:
+            self.count -= bin(self.rows.pop(k)).count("1")
+
+
+class SightIndex:
+    """
+    Visibility lookups for one WallGrid (outer edges walled, as every
+    generator makes them), built once per level, so revealing what a
+    player sees is a few index lookups and bitmask ORs:
+        runs[d][i]          open cells in a straight line from cell i in
+                            direction d (0..3 = N, E, S, W) before the first wall
+        line_of_sight(i)    cells seen from cell i down those corridors,
+                            i itself included
+        hood(i, r)          cells within r open steps of cell i
+        view(i, r)          line_of_sight(i) widened by r open steps, r up to MAX_PEEK
+    Cell i is (i % w, i // w), as in WallGrid. The cell sets are tuples of
+    (y, mask) pairs, bit x of mask for cell (x, y), as RevealedCells takes them.
+    The runs are made for the whole maze up front. The cell sets are made from
+    them the first time each cell asks and then kept, so memory follows the
+    explored part of the maze rather than its size.
+    view() reveals the same cells as MazeModel walking the corridors:
+    >>> from maze_model import MazeModel
+    >>> m = MazeModel((12, 9), seed=3)
+    >>> m.build_level()
+    >>> sight = SightIndex(m.walls)
+    >>> all(set(mask_cells(sight.view(y * 12 + x, r))) == m.expand_peek(m.visible_cells_los(x, y), r)
+    ...     for y in range(9) for x in range(12) for r in range(SightIndex.MAX_PEEK + 1))
+    True
+    """
+    MAX_PEEK = 5
+
+    def __init__(self, walls):
+        w, cells = walls.w, walls.cells
+        n = len(cells)
+        self.w = w
+        self.cells = cells
+        self.steps = steps = (-w, 1, w, -1)
+
+        # Run length towards d is 0 at a wall, else one more than the neighbor's,
+        # so fill N and W runs top-down and S and E runs bottom-up
+        runs = [[0] * n for _ in range(4)]
+        for d, bit in enumerate(DIR_BITS):
+            run, step = runs[d], steps[d]
+            order = range(n) if step < 0 else range(n - 1, -1, -1)
+            for i in order:
+                if not cells[i] & bit:
+                    run[i] = run[i + step] + 1
+        self.runs = runs
+
+        self.los = {}
+        self.hoods = [{} for _ in range(self.MAX_PEEK + 1)]
+        self.views = {}
+
+    def line_of_sight(self, i):
+        """Row masks of the cells seen from cell i down its corridors."""
+        seen = self.los.get(i)
+        if seen is None:
+            runs, w = self.runs, self.w
+            x, y = i % w, i // w
+            up, right, down, left = runs[0][i], runs[1][i], runs[2][i], runs[3][i]
+            masks = dict.fromkeys(range(y - up, y + down + 1), 1 << x)
+            masks[y] = ((1 << (left + 1 + right)) - 1) << (x - left)
+            seen = tuple(masks.items())
+            self.los[i] = seen
+        return seen
+
+    def hood(self, i, r):
+        """Row masks of the cells within r open steps of cell i."""
+        table = self.hoods[r]
+        near = table.get(i)
+        if near is None:
+            if r == 0:
+                near = ((i // self.w, 1 << (i % self.w)),)
+            else:
+                # One step further than the open neighbors' (r - 1) neighborhoods
+                cells, steps = self.cells, self.steps
+                near = merge_masks([self.hood(i, r - 1)] + [self.hood(i + steps[d], r - 1)
+                                                            for d in range(4)
+                                                            if not cells[i] & DIR_BITS[d]])
+            table[i] = near
+        return near
+
+    def view(self, i, r=0):
+        """Row masks of the cells revealed from cell i with peek radius r."""
+        if r == 0:
+            return self.line_of_sight(i)
+        key = i * (self.MAX_PEEK + 1) + r
+        seen = self.views.get(key)
+        if seen is None:
+            w = self.w
+            seen = merge_masks([self.hood(y * w + x, r)
+                                for (x, y) in mask_cells(self.line_of_sight(i))])
+            self.views[key] = seen
+        return seen
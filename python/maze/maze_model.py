@@ -0,0 +1,409 @@
+"""
+The two-player maze race without any UI: building levels, moves,
+fog-of-war reveal, apples and winning. TwoPlayerMazeGame in maze.py
+shows one of these in Tk; maze_play_bench.py has bots play it headless.
+"""
+import math
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from maze_gen import (DIRS, RevealedCells, RowWindow, SightIndex, bfs_distances,
+                      downhill, farthest_points, generate_maze)
+from maze_pack import PackedLevel
+
+
+@dataclass
+class Player:
+    name: str
+    color: str
+    x: int
+    y: int
+    trail: list = None       # strokes, see MazeModel.extend_trail()
+    trail_edges: set = None  # steps already in the trail, see MazeModel.extend_trail()
+
+
+@dataclass
+class MoveResult:
+    """What a move changed, from MazeModel.try_move()."""
+    new_cells: set   # cells revealed by the move
+    eaten: list      # apples collected by the move, as (x, y)
+    won: bool        # the player reached the goal
+
+
+class MazeModel:
+    # Settings a prepared level is made with, see prepare_level()
+    SETTINGS = ("base_w", "base_h", "start_x_override", "size_override", "generator", "endless",
+                "pack")
+
+    # Everything make_level() makes, swapped in from a prepared level by build_level()
+    LEVEL_FIELDS = ("w", "h", "walls", "sight", "start_x", "start_y", "goal_x", "goal_y",
+                    "dist_start", "dist_goal", "apples", "apple_target", "apples_collected",
+                    "apple_fields", "level_apples")
+
+    def __init__(self, size=None, seed=None):
+        self.rng = random.Random(seed)
+
+        # Level parameters
+        self.level = 1
+        self.base_w = 10
+        self.base_h = 10
+
+        # Start column parameter (None -> center)
+        self.start_x_override = None
+
+        # Fixed (w, h) for every level instead of growing to 30x30 (None -> grow)
+        self.size_override = size
+
+        # Maze algorithm, a name from maze_gen.GENERATORS
+        self.generator = "prim"
+
+        # Endless descent: rows are made as the players go down and dropped
+        # once keep_rows above both of them.
+        self.endless = False
+        self.keep_rows = 40
+
+        # Level pack (a maze_pack.LevelPack) to play instead of making mazes:
+        # level n is its level n - 1, going round again after the last.
+        # An empty pack has nothing to play, so levels are made as without one.
+        self.pack = None
+
+        # Peek radius (0..5): revealed cells reach this many open steps
+        # past what is in line of sight
+        self.peek = 0
+
+    # -----------------------
+    # Level + sizing
+    # -----------------------
+
+    def level_size(self, lvl):
+        if self.size_override:
+            return self.size_override
+        w = self.base_w + (lvl - 1) * 2
+        h = self.base_h + (lvl - 1) * 2
+        return min(w, 30), min(h, 30)
+
+    def choose_start_x(self):
+        if self.start_x_override is not None:
+            return max(0, min(self.w - 1, self.start_x_override))
+        return self.w // 2
+
+    def apple_target_for_size(self, w, h):
+        """
+        Starts at 3, ramps up to 5 for largest mazes.
+        """
+        m = max(w, h)
+        # 10 -> 3, ~16 -> 4, ~22+ -> 5
+        if m >= 22:
+            return 5
+        if m >= 16:
+            return 4
+        return 3
+
+    def build_level(self, prepared=None):
+        """
+        Start the current level. prepared is a prepare_level() result to
+        swap in, else the level is made here and now.
+        """
+        if prepared is None:
+            self.make_level()
+        else:
+            for name in self.LEVEL_FIELDS:
+                setattr(self, name, getattr(prepared, name))
+
+        # Players start on same square at top middle
+        self.p1 = Player("P1", "#2ecc71", self.start_x, self.start_y, trail=[], trail_edges=set())
+        self.p2 = Player("P2", "#3498db", self.start_x, self.start_y, trail=[], trail_edges=set())
+
+        # Reset reveal, then initial visibility
+        self.revealed_cells = RevealedCells()
+        self.update_visibility()
+
+    def make_level(self):
+        """Walls, start, goal, distance fields and apples for the current level."""
+        if self.pack is not None and len(self.pack) and not self.endless:
+            self.load_level(self.pack[(self.level - 1) % len(self.pack)])
+            return
+        self.w, self.h = self.level_size(self.level)
+        self.make_walls()
+
+        self.start_x = self.choose_start_x()
+        self.start_y = 0
+
+        # Finish is one cell on bottom row, none when endless
+        if self.endless:
+            self.goal_x = self.goal_y = None
+        else:
+            self.goal_y = self.h - 1
+            self.goal_x = self.rng.randint(0, self.w - 1)
+        self.compute_distances()
+
+        # Apples
+        self.place_apples()
+
+    def load_level(self, packed):
+        """Make the current level the maze_pack.PackedLevel packed."""
+        self.walls = packed.walls
+        self.w, self.h = packed.walls.w, packed.walls.h
+        self.sight = SightIndex(self.walls)
+        self.start_x, self.start_y = packed.start
+        self.goal_x, self.goal_y = packed.goal
+        self.compute_distances()
+        self.apples_collected = 0
+        self.apples = set(packed.apples)
+        self.level_apples = sorted(self.apples)
+        self.apple_target = len(self.apples)
+        self.apple_fields = {(x, y): bfs_distances(self.walls, y * self.w + x) for (x, y) in self.apples}
+
+    def packed_level(self):
+        """The current level as it started, as a maze_pack.PackedLevel to save."""
+        if self.endless:
+            raise ValueError("endless levels cannot be packed")
+        return PackedLevel(self.walls, (self.start_x, self.start_y), (self.goal_x, self.goal_y),
+                           list(self.level_apples))
+
+    def prepare_level(self, level, seed=None):
+        """
+        Make level number level with this model's settings, without
+        touching the level being played, so it can run on another thread.
+        Returns a MazeModel holding it, to pass to build_level() once
+        fits() says it is still wanted. Its prepare_seconds is how long it took.
+        """
+        start = time.perf_counter()
+        prepared = MazeModel(seed=seed)
+        for name in self.SETTINGS:
+            setattr(prepared, name, getattr(self, name))
+        prepared.level = level
+        prepared.make_level()
+        prepared.prepare_seconds = time.perf_counter() - start
+        return prepared
+
+    def fits(self, prepared):
+        """True if prepared was made for the current level and settings."""
+        return prepared.level == self.level and all(
+            getattr(prepared, name) == getattr(self, name) for name in self.SETTINGS)
+
+    def make_walls(self):
+        seed = self.rng.getrandbits(32)
+        if self.endless:
+            self.h = math.inf
+            self.walls = RowWindow(self.w, seed)
+            self.sight = None
+        else:
+            self.walls = generate_maze(self.generator, self.w, self.h, seed)
+            self.sight = SightIndex(self.walls)
+
+    def compute_distances(self):
+        """Path distance from the start and the goal to every cell, index y * w + x."""
+        if self.endless:
+            self.dist_start = self.dist_goal = None
+            return
+        self.dist_start = bfs_distances(self.walls, self.start_y * self.w + self.start_x)
+        self.dist_goal = bfs_distances(self.walls, self.goal_y * self.w + self.goal_x)
+
+    def place_apples(self):
+        """
+        Place apples spread out along the maze paths: each one goes in a
+        cell farthest by path distance from the start, the goal, and the
+        apples placed before it.
+        """
+        self.apples_collected = 0
+        if self.endless:
+            self.apple_target = 0
+            self.apples = set()
+            self.level_apples = []
+            self.apple_fields = {}
+            return
+        target = self.apple_target_for_size(self.w, self.h)
+        self.apple_target = target
+
+        nearest = [min(a, b) for a, b in zip(self.dist_start, self.dist_goal)]
+        # Placing each apple measures the path distance from it; keep those
+        # for hint(), so eating an apple does not need a new search
+        fields = []
+        picks = farthest_points(self.walls, target, nearest, self.rng, fields)
+        self.apples = {(i % self.w, i // self.w) for i in picks}
+        self.level_apples = sorted(self.apples)
+        self.apple_fields = {(i % self.w, i // self.w): dist for i, dist in zip(picks, fields)}
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.w and self.top_row() <= y < self.h
+
+    def top_row(self):
+        """First row still held: 0, or the top of the endless row window."""
+        return self.walls.top if self.endless else 0
+
+    def discard_rows(self):
+        """
+        Endless mode: drop the rows (and what was revealed in them)
+        more than keep_rows above both players.
+        """
+        keep_from = min(self.p1.y, self.p2.y) - self.keep_rows
+        if self.walls.discard_above(keep_from):
+            top = self.walls.top
+            self.revealed_cells.discard_above(top)
+            for p in (self.p1, self.p2):
+                p.trail = [s for s in p.trail if max(y for (_, y) in s) >= top]
+                first = 2 * top * self.w
+                p.trail_edges = {e for e in p.trail_edges if e >= first}
+
+    # -----------------------
+    # Visibility model
+    # -----------------------
+
+    def visible_cells_los(self, x, y):
+        visible = {(x, y)}
+        for d, (dx, dy) in DIRS.items():
+            cx, cy = x, y
+            while True:
+                if self.walls[cy][cx][d]:
+                    break
+                nx, ny = cx + dx, cy + dy
+                if not self.in_bounds(nx, ny):
+                    break
+                visible.add((nx, ny))
+                cx, cy = nx, ny
+        return visible
+
+    def neighbors_open(self, x, y):
+        for d, (dx, dy) in DIRS.items():
+            if not self.walls[y][x][d]:
+                nx, ny = x + dx, y + dy
+                if self.in_bounds(nx, ny):
+                    yield nx, ny
+
+    def expand_peek(self, seeds, radius):
+        if radius <= 0:
+            return set(seeds)
+
+        seen = set(seeds)
+        q = deque((cell, 0) for cell in seeds)
+        while q:
+            (x, y), dist = q.popleft()
+            if dist == radius:
+                continue
+            for nx, ny in self.neighbors_open(x, y):
+                if (nx, ny) not in seen:
+                    seen.add((nx, ny))
+                    q.append(((nx, ny), dist + 1))
+        return seen
+
+    def update_visibility(self):
+        """
+        Reveal what the players can see now. Returns the cells that were
+        not revealed before, which are all that needs drawing.
+        """
+        peek = self.peek
+        revealed = self.revealed_cells
+        if self.sight and 0 <= peek <= SightIndex.MAX_PEEK:
+            w = self.w
+            new_cells = revealed.reveal_masks(self.sight.view(self.p1.y * w + self.p1.x, peek))
+            new_cells |= revealed.reveal_masks(self.sight.view(self.p2.y * w + self.p2.x, peek))
+            return new_cells
+
+        # Endless rows are not indexed, walk the corridors
+        v = set()
+        v |= self.expand_peek(self.visible_cells_los(self.p1.x, self.p1.y), peek)
+        v |= self.expand_peek(self.visible_cells_los(self.p2.x, self.p2.y), peek)
+        return revealed.reveal(v)
+
+    # -----------------------
+    # Trails
+    # -----------------------
+
+    # A trail is a list of strokes, each a list of cells: where the player
+    # turned, with straight runs merged into one step. Steps already in the
+    # trail (trail_edges, 2 * i for the step east of cell i, 2 * i + 1 for
+    # the step south of it) are not added again, so going back and forth
+    # down a corridor does not make it grow; moving on from somewhere other
+    # than the end of the last stroke starts a new stroke.
+
+    def ensure_trails_initialized(self):
+        for p in (self.p1, self.p2):
+            if not p.trail:
+                p.trail = [[(p.x, p.y)]]
+
+    def extend_trail(self, p, fx, fy):
+        """Add the step from (fx, fy) to where player p is now to its trail."""
+        here = (p.x, p.y)
+        w = self.w
+        edge = 2 * min(fy * w + fx, p.y * w + p.x) + (fy != p.y)
+        if edge in p.trail_edges:
+            return
+        p.trail_edges.add(edge)
+        stroke = p.trail[-1] if p.trail else None
+        if stroke is None or stroke[-1] != (fx, fy):
+            p.trail.append([(fx, fy), here])
+        elif len(stroke) > 1 and (stroke[-2][0] == fx == p.x or stroke[-2][1] == fy == p.y):
+            stroke[-1] = here
+        else:
+            stroke.append(here)
+
+    # -----------------------
+    # Movement + apples
+    # -----------------------
+
+    def can_move(self, x, y, direction):
+        if self.walls[y][x][direction]:
+            return False
+        dx, dy = DIRS[direction]
+        nx, ny = x + dx, y + dy
+        return self.in_bounds(nx, ny)
+
+    def check_apple_collect(self):
+        """
+        If either player is on an apple, collect it.
+        Returns the list of apples collected.
+        """
+        eaten = []
+        for pos in [(self.p1.x, self.p1.y), (self.p2.x, self.p2.y)]:
+            if pos in self.apples:
+                self.apples.remove(pos)
+                self.apples_collected += 1
+                eaten.append(pos)
+        return eaten
+
+    def hint(self, player, target="apple"):
+        """
+        Direction name that takes player one step closer to the nearest
+        apple ("apple", falling back to the goal once all are eaten) or the
+        goal ("goal"). None in endless mode or when already there.
+        """
+        if self.endless:
+            return None
+        i = player.y * self.w + player.x
+        dist = self.dist_goal
+        if target == "apple" and self.apples:
+            dist = min((self.apple_fields[apple] for apple in self.apples), key=lambda field: field[i])
+        return downhill(self.walls, dist, i)
+
+    def try_move(self, player, direction):
+        """
+        Move player one cell in direction, if no wall is in the way.
+        Returns a MoveResult, or None if the move was blocked.
+        """
+        if not self.can_move(player.x, player.y, direction):
+            return None
+
+        self.ensure_trails_initialized()
+
+        fx, fy = player.x, player.y
+        dx, dy = DIRS[direction]
+        player.x += dx
+        player.y += dy
+
+        self.extend_trail(player, fx, fy)
+
+        if self.endless:
+            self.discard_rows()
+
+        # Update reveal (collaborative)
+        new_cells = self.update_visibility()
+
+        # Collect apples (collaborative)
+        eaten = self.check_apple_collect()
+
+        # Win condition
+        won = player.x == self.goal_x and player.y == self.goal_y
+        return MoveResult(new_cells, eaten, won)
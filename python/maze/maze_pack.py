@@ -0,0 +1,228 @@
+"""
+Level packs: many mazes with their start, goal and apples in one binary
+file, so curated levels can be shipped and a maze played again.
+
+    python maze_pack.py make PACK [count] [size] [algorithm] [seed]
+    python maze_pack.py list PACK
+
+make writes count levels (default 20) of size x size (default growing
+with the level, as in the game) made the way MazeModel makes them;
+list prints what a pack holds. Play one with python maze.py PACK.
+
+File layout, integers little-endian:
+
+    magic         4 bytes   b"MAZP"
+    version       1 byte    FORMAT_VERSION
+    count         4 bytes   number of levels
+    index_offset  8 bytes   where the index starts
+    levels        count entries, see below
+    index         count x 8 bytes, the offset of each level
+
+Each level:
+
+    w, h, start_x, start_y, goal_x, goal_y    4 bytes each
+    apple count                               2 bytes
+    apples                                    count x (x, y), 4 bytes each
+    walls                                     the WallGrid cell masks,
+                                              4 bits each, two cells a byte,
+                                              the first in the low bits
+
+The index is at the end so levels can be written as they are made.
+LevelPack maps the file and decodes a level only when it is asked for,
+so opening a pack of thousands of big mazes reads nothing but the header.
+"""
+import mmap
+import struct
+import sys
+from dataclasses import dataclass
+
+from maze_gen import WallGrid
+
+MAGIC = b"MAZP"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sBIQ")
+LEVEL_HEADER = struct.Struct("<IIIIIIH")
+POINT = struct.Struct("<II")
+OFFSET = struct.Struct("<Q")
+
+# bytes.translate() tables between cell masks and packed nibbles
+LOW_NIBBLE = bytes(b & 15 for b in range(256))
+HIGH_NIBBLE = bytes(b >> 4 for b in range(256))
+TO_HIGH_NIBBLE = bytes((b << 4) & 255 for b in range(256))
+
+
+@dataclass
+class PackedLevel:
+    """One level of a pack; cells are (x, y)."""
+    walls: WallGrid
+    start: tuple
+    goal: tuple
+    apples: list
+
+
+def pack_walls(cells):
+    """
+    Cell masks (0..15 each) two to a byte, the first in the low nibble;
+    an odd last one gets a zero high nibble.
+    >>> pack_walls([1, 2, 15, 4, 9]).hex()
+    '214f09'
+    >>> list(unpack_walls(pack_walls([1, 2, 15, 4, 9]), 5))
+    [1, 2, 15, 4, 9]
+    """
+    cells = bytes(cells)
+    if len(cells) % 2:
+        cells += b"\0"
+    low = int.from_bytes(cells[0::2], "little")
+    high = int.from_bytes(cells[1::2].translate(TO_HIGH_NIBBLE), "little")
+    return (low | high).to_bytes(len(cells) // 2, "little")
+
+
+def unpack_walls(packed, n):
+    """The first n cell masks of pack_walls() output, as a bytearray."""
+    cells = bytearray(2 * len(packed))
+    cells[0::2] = packed.translate(LOW_NIBBLE)
+    cells[1::2] = packed.translate(HIGH_NIBBLE)
+    del cells[n:]
+    return cells
+
+
+def dumps_level(level):
+    """The file-format bytes of one PackedLevel."""
+    walls = level.walls
+    out = bytearray(LEVEL_HEADER.pack(walls.w, walls.h, *level.start, *level.goal, len(level.apples)))
+    for apple in level.apples:
+        out += POINT.pack(*apple)
+    out += pack_walls(walls.cells)
+    return out
+
+
+def save_pack(levels, filename):
+    """
+    Write the PackedLevels in levels to filename, one at a time, so levels
+    can be a generator making them as it goes. Returns how many were written.
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'levels.mazp')
+    >>> walls = WallGrid(3, 1)
+    >>> walls.open_passage(0, 0, "E")
+    >>> save_pack([PackedLevel(walls, (0, 0), (2, 0), [(1, 0)])] * 2, path)
+    2
+    >>> with LevelPack(path) as pack:
+    ...     len(pack), pack[1] == PackedLevel(walls, (0, 0), (2, 0), [(1, 0)])
+    (2, True)
+    """
+    offsets = []
+    with open(filename, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+        pos = HEADER.size
+        for level in levels:
+            data = dumps_level(level)
+            offsets.append(pos)
+            f.write(data)
+            pos += len(data)
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(offsets), pos))
+    return len(offsets)
+
+
+class LevelPack:
+    """
+    A pack file opened for reading, through mmap. pack[n] is level n
+    (from 0) as a PackedLevel, decoded from the file when asked for;
+    len(pack) is how many there are.
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'empty.mazp')
+    >>> save_pack([], path)
+    0
+    >>> from maze_model import MazeModel
+    >>> model = MazeModel((8, 6), seed=1)
+    >>> with LevelPack(path) as pack:
+    ...     model.pack = pack
+    ...     model.build_level()
+    >>> len(model.pack), (model.w, model.h)
+    (0, (8, 6))
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mm) < HEADER.size:
+            self.close()
+            raise ValueError(f"{filename}: too short for a level pack")
+        magic, version, self.count, self.index_offset = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{filename}: not a level pack, bad magic {magic!r}")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{filename}: unsupported level pack version {version}")
+        if len(self.mm) < self.index_offset + self.count * OFFSET.size:
+            self.close()
+            raise ValueError(f"{filename}: level pack truncated")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, n):
+        if not 0 <= n < self.count:
+            raise IndexError(n)
+        mm = self.mm
+        (pos,) = OFFSET.unpack_from(mm, self.index_offset + n * OFFSET.size)
+        w, h, sx, sy, gx, gy, apple_count = LEVEL_HEADER.unpack_from(mm, pos)
+        pos += LEVEL_HEADER.size
+        apples = [POINT.unpack_from(mm, pos + k * POINT.size) for k in range(apple_count)]
+        pos += apple_count * POINT.size
+        cells = unpack_walls(mm[pos:pos + (w * h + 1) // 2], w * h)
+        return PackedLevel(WallGrid(w, h, cells), (sx, sy), (gx, gy), apples)
+
+    def __iter__(self):
+        for n in range(self.count):
+            yield self[n]
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def make_levels(count, size=None, generator="prim", seed=None):
+    """count PackedLevels made by a MazeModel, levels 1 to count."""
+    from maze_model import MazeModel
+
+    model = MazeModel(size, seed)
+    model.generator = generator
+    for level in range(1, count + 1):
+        model.level = level
+        model.make_level()
+        yield model.packed_level()
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ("make", "list"):
+        print(__doc__.split("\n\n")[1])
+        sys.exit(1)
+    command, filename = args[:2]
+    if command == "make":
+        count = int(args[2]) if len(args) > 2 else 20
+        size = (int(args[3]), int(args[3])) if len(args) > 3 else None
+        generator = args[4] if len(args) > 4 else "prim"
+        seed = int(args[5]) if len(args) > 5 else None
+        written = save_pack(make_levels(count, size, generator, seed), filename)
+        print(f"{filename}: {written} levels")
+    else:
+        with LevelPack(filename) as pack:
+            print(f"{filename}: {len(pack)} levels")
+            for n, level in enumerate(pack, 1):
+                print(f"  {n:>4}  {level.walls.w}x{level.walls.h}  start {level.start}"
+                      f"  goal {level.goal}  apples {len(level.apples)}")
+
+
+if __name__ == "__main__":
+    main()
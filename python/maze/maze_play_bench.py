@@ -0,0 +1,150 @@
+"""
+Headless play benchmark: scripted bots play many levels of MazeModel,
+no display needed.
+
+    python maze_play_bench.py [levels] [size] [bot ...]
+
+Bots, from BOTS: random (random walk), wall (right-hand wall follower) and
+bfs (shortest path to the goal). A bot moves both players in turn until one
+reaches the goal, on size x size mazes (default 1000 levels of 15x15),
+giving up on a level after 20 moves per cell.
+For each bot it reports moves per second, then plays the same levels again
+with the model's methods timed, to show where the time goes.
+"""
+import random
+import sys
+import time
+from collections import Counter
+
+from maze_gen import DIR_NAMES, OPP
+from maze_model import MazeModel
+
+RIGHT = {"N": "E", "E": "S", "S": "W", "W": "N"}
+LEFT = {d: r for r, d in RIGHT.items()}
+
+# Model methods to time, with how deep they nest, for the breakdown.
+# can_move is called by try_move and by the bots, so it is not nested.
+TIMED = [
+    ("build_level", 0),
+    ("make_walls", 1),
+    ("compute_distances", 1),
+    ("place_apples", 1),
+    ("try_move", 0),
+    ("update_visibility", 1),
+    ("check_apple_collect", 1),
+    ("can_move", 0),
+]
+
+
+class RandomWalk:
+    """Steps through a random opening each move."""
+    def __init__(self, model, player, rng):
+        self.model = model
+        self.player = player
+        self.rng = rng
+
+    def choose(self):
+        p = self.player
+        return self.rng.choice([d for d in DIR_NAMES if self.model.can_move(p.x, p.y, d)])
+
+
+class WallFollower(RandomWalk):
+    """Keeps its right hand on the wall."""
+    def __init__(self, model, player, rng):
+        super().__init__(model, player, rng)
+        self.heading = "S"
+
+    def choose(self):
+        p, h = self.player, self.heading
+        for d in (RIGHT[h], h, LEFT[h], OPP[h]):
+            if self.model.can_move(p.x, p.y, d):
+                self.heading = d
+                return d
+
+
+class ShortestPath(RandomWalk):
+    """Walks down the model's distance-to-goal field."""
+    def choose(self):
+        return self.model.hint(self.player, "goal")
+
+
+BOTS = {"random": RandomWalk, "wall": WallFollower, "bfs": ShortestPath}
+
+
+def time_methods(model, times, calls):
+    """Replace model's TIMED methods with wrappers adding into times and calls."""
+    for name, _ in TIMED:
+        method = getattr(model, name)
+
+        def timed(*args, _method=method, _name=name):
+            start = time.perf_counter()
+            try:
+                return _method(*args)
+            finally:
+                times[_name] += time.perf_counter() - start
+                calls[_name] += 1
+        setattr(model, name, timed)
+
+
+def play(bot_class, levels, size, timed=False, seed=1):
+    """
+    Play levels levels with bot_class driving both players.
+    Returns (seconds, moves, levels won, times, calls); times and calls
+    are Counters by method name, filled only when timed.
+    """
+    model = MazeModel((size, size), seed)
+    rng = random.Random(seed)
+    times, calls = Counter(), Counter()
+    if timed:
+        time_methods(model, times, calls)
+    max_moves = 20 * size * size
+    moves = won = 0
+    bot_seconds = 0.0
+
+    start = time.perf_counter()
+    for level in range(levels):
+        model.build_level()
+        bots = [bot_class(model, p, rng) for p in (model.p1, model.p2)]
+        for turn in range(max_moves):
+            bot = bots[turn % 2]
+            if timed:
+                t0 = time.perf_counter()
+                d = bot.choose()
+                bot_seconds += time.perf_counter() - t0
+            else:
+                d = bot.choose()
+            result = model.try_move(bot.player, d)
+            moves += 1
+            if result and result.won:
+                won += 1
+                break
+    seconds = time.perf_counter() - start
+    times["bot choose"] = bot_seconds
+    return seconds, moves, won, times, calls
+
+
+def main():
+    args = sys.argv[1:]
+    levels = int(args[0]) if args else 1000
+    size = int(args[1]) if len(args) > 1 else 15
+    names = args[2:] or list(BOTS)
+
+    print(f"{levels} levels of {size}x{size}")
+    print(f"{'bot':<8}{'won':>6}{'moves':>10}{'moves/s':>10}{'moves/level':>13}")
+    for name in names:
+        seconds, moves, won, _, _ = play(BOTS[name], levels, size)
+        print(f"{name:<8}{won:>6}{moves:>10}{moves / seconds:>10.0f}{moves / levels:>13.1f}", flush=True)
+
+    for name in names:
+        seconds, moves, won, times, calls = play(BOTS[name], levels, size, timed=True)
+        print(f"\n{name}: where the time went, timed run {seconds:.2f}s")
+        rows = TIMED[:-1] + [("bot choose", 0), TIMED[-1]]
+        for n, depth in rows:
+            label = "  " * depth + n
+            count = calls[n] or moves
+            print(f"  {label:<24}{times[n]:>8.3f}s{100 * times[n] / seconds:>7.1f}%"
+                  f"{1e6 * times[n] / count:>9.1f}us/call")
+
+
+if __name__ == "__main__":
+    main()
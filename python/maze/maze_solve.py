@@ -0,0 +1,248 @@
+"""
+Solving and measuring mazes, to check what the generators make and to
+tune levels from many samples rather than a few looks.
+
+    python maze_solve.py [seeds] [size] [algorithm ...]
+
+Solves seeds mazes (default 200) of size x size (default 50) from the
+top-left to the bottom-right corner with each algorithm in
+maze_gen.GENERATORS, across a process pool, and reports the averages of
+analyze(): solution length, how much of the maze it covers, dead ends,
+junctions, and the choices met along the way.
+
+Everything here works on a WallGrid's flat cells bytearray, cell
+i = y * w + x; walls in the nested-dict form of generate_maze_prim() are
+converted first. Cells are given and returned as indices.
+
+A 3 x 2 maze, cells 0 1 2 over 3 4 5, with dead ends at 2 and 3:
+
+    >>> walls = WallGrid(3, 2)
+    >>> for x, y, d in [(0, 0, "E"), (1, 0, "E"), (0, 0, "S"), (1, 0, "S"), (1, 1, "E")]:
+    ...     walls.open_passage(x, y, d)
+    >>> bfs_path(walls, 0, 5)
+    [0, 1, 4, 5]
+    >>> len(astar_path(walls, 0, 5)) == len(bfs_path(walls, 0, 5))
+    True
+    >>> list(dead_end_fill(walls, keep=(0, 5)))
+    [0, 0, 1, 1, 0, 0]
+    >>> is_perfect(walls), analyze(walls)["solution"]
+    (True, 3)
+
+Opening the wall between 2 and 5 makes a loop, so it is no longer perfect:
+
+    >>> walls.open_passage(2, 0, "S")
+    >>> is_perfect(walls), len(astar_path(walls, 0, 5)) == len(bfs_path(walls, 0, 5))
+    (False, True)
+"""
+import heapq
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from maze_gen import DIR_BITS, GENERATORS, WallGrid, bfs_distances, generate_maze
+
+# Open sides of each 4-bit wall mask
+OPENINGS = [4 - bin(m).count("1") for m in range(16)]
+
+# bytes.translate() tables turning wall masks into the number of open
+# sides, or 1/0 for walled/open on one side, so whole rows compare at once
+OPENINGS_TABLE = bytes(OPENINGS[m & 15] for m in range(256))
+SIDE_TABLES = [bytes(int(bool(m & bit)) for m in range(256)) for bit in DIR_BITS]
+
+
+def as_grid(walls):
+    """walls as a WallGrid, converting nested dicts from generate_maze_prim()."""
+    return walls if isinstance(walls, WallGrid) else WallGrid.from_dicts(walls)
+
+
+def neighbors(cells, w, i):
+    """Cells one open step from cell i."""
+    m = cells[i]
+    if not m & 1:
+        yield i - w
+    if not m & 2:
+        yield i + 1
+    if not m & 4:
+        yield i + w
+    if not m & 8:
+        yield i - 1
+
+
+def bfs_path(walls, start, goal):
+    """Shortest path from start to goal as a list of cells, None if there is none."""
+    walls = as_grid(walls)
+    w, cells = walls.w, walls.cells
+    prev = [-1] * len(cells)
+    prev[start] = start
+    queue = [start]
+    for i in queue:  # as in bfs_distances(), the list is the queue
+        if i == goal:
+            break
+        for j in neighbors(cells, w, i):
+            if prev[j] < 0:
+                prev[j] = i
+                queue.append(j)
+    else:
+        return None
+    return walk_back(prev, start, goal)
+
+
+def astar_path(walls, start, goal):
+    """
+    Shortest path from start to goal as a list of cells, None if there is
+    none, searching towards the goal first (Manhattan distance).
+    """
+    walls = as_grid(walls)
+    w, cells = walls.w, walls.cells
+    gx, gy = goal % w, goal // w
+    cost = [-1] * len(cells)
+    prev = [-1] * len(cells)
+    cost[start] = 0
+    prev[start] = start
+    heap = [(abs(start % w - gx) + abs(start // w - gy), start)]
+    while heap:
+        _, i = heapq.heappop(heap)
+        if i == goal:
+            return walk_back(prev, start, goal)
+        c = cost[i] + 1
+        for j in neighbors(cells, w, i):
+            if cost[j] < 0 or c < cost[j]:
+                cost[j] = c
+                prev[j] = i
+                heapq.heappush(heap, (c + abs(j % w - gx) + abs(j // w - gy), j))
+    return None
+
+
+def walk_back(prev, start, goal):
+    path = [goal]
+    while path[-1] != start:
+        path.append(prev[path[-1]])
+    path.reverse()
+    return path
+
+
+def dead_end_fill(walls, keep=()):
+    """
+    Fill dead ends until none are left, never filling the cells in keep
+    (say the start and goal). Returns a bytearray, 1 for each filled cell;
+    what is left is every cell on a route between the kept cells, which in a
+    perfect maze is just the path between them.
+    """
+    walls = as_grid(walls)
+    w, cells = walls.w, walls.cells
+    degree = [OPENINGS[m] for m in cells]
+    filled = bytearray(len(cells))
+    keep = set(keep)
+    stack = [i for i, d in enumerate(degree) if d <= 1 and i not in keep]
+    while stack:
+        i = stack.pop()
+        filled[i] = 1
+        for j in neighbors(cells, w, i):
+            if not filled[j]:
+                degree[j] -= 1
+                if degree[j] == 1 and j not in keep:
+                    stack.append(j)
+    return filled
+
+
+def is_perfect(walls):
+    """
+    True if walls is a perfect maze: sides agree between neighbors, the
+    outer edge is closed, and the open passages make a tree (every cell
+    reachable by exactly one route).
+    """
+    walls = as_grid(walls)
+    w, h, cells = walls.w, walls.h, walls.cells
+    north, east, south, west = (bytes(cells).translate(t) for t in SIDE_TABLES)
+    closed = b"\x01"
+    if north[:w] != closed * w or south[-w:] != closed * w \
+            or west[::w] != closed * h or east[w - 1::w] != closed * h:
+        return False
+    if south[:-w] != north[w:]:
+        return False
+    for y in range(h):
+        row = y * w
+        if east[row:row + w - 1] != west[row + 1:row + w]:
+            return False
+    passages = east.count(0) + south.count(0)
+    return passages == len(cells) - 1 and min(bfs_distances(walls, 0)) >= 0
+
+
+def branching_stats(walls):
+    """Cells by number of openings: isolated (0), dead ends, corridors, junctions (3) and crossings (4)."""
+    openings = bytes(as_grid(walls).cells).translate(OPENINGS_TABLE)
+    return dict(zip(("isolated", "dead_ends", "corridors", "junctions", "crossings"),
+                    map(openings.count, range(5))))
+
+
+def analyze(walls, start=0, goal=None):
+    """
+    Difficulty measures for walls from cell start to cell goal (default the
+    last cell, the bottom-right corner):
+        solution     steps on the shortest path, -1 if there is none
+        coverage     share of the cells on it
+        choices      side openings passed along it, each a wrong turn to avoid
+        perfect      is_perfect()
+    plus the counts from branching_stats().
+    """
+    walls = as_grid(walls)
+    cells = walls.cells
+    if goal is None:
+        goal = len(cells) - 1
+    path = bfs_path(walls, start, goal)
+    stats = branching_stats(walls)
+    stats["perfect"] = is_perfect(walls)
+    if path is None:
+        stats.update(solution=-1, coverage=0.0, choices=0)
+        return stats
+    stats["solution"] = len(path) - 1
+    stats["coverage"] = len(path) / len(cells)
+    # Openings along the path beyond the ones it uses; the ends use one each
+    stats["choices"] = sum(OPENINGS[cells[i]] for i in path) - 2 * (len(path) - 1)
+    return stats
+
+
+def analyze_seed(job):
+    """analyze() for one (algorithm, w, h, seed) maze; top level so a process pool can run it."""
+    name, w, h, seed = job
+    return analyze(generate_maze(name, w, h, seed))
+
+
+def batch(name, w, h, seeds, processes=None):
+    """
+    analyze() the w x h mazes from algorithm name for each seed in seeds,
+    spread over processes worker processes (default one per CPU).
+    Returns the results in seed order.
+    """
+    jobs = [(name, w, h, seed) for seed in seeds]
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(analyze_seed, jobs, chunksize=max(1, len(jobs) // 64)))
+
+
+def summarize(results):
+    """Mean of each number in a list of analyze() results; perfect becomes the share that were."""
+    return {k: sum(r[k] for r in results) / len(results) for k in results[0]}
+
+
+def main():
+    args = sys.argv[1:]
+    seeds = int(args[0]) if args else 200
+    size = int(args[1]) if len(args) > 1 else 50
+    names = args[2:] or list(GENERATORS)
+    cells = size * size
+
+    print(f"{seeds} mazes of {size}x{size}, means")
+    print(f"{'algorithm':<12}{'seconds':>9}{'solution':>10}{'coverage %':>12}{'choices':>9}"
+          f"{'dead ends %':>13}{'junctions %':>13}{'perfect %':>11}")
+    for name in names:
+        start = time.perf_counter()
+        s = summarize(batch(name, size, size, range(seeds)))
+        seconds = time.perf_counter() - start
+        print(f"{name:<12}{seconds:>9.2f}{s['solution']:>10.1f}{100 * s['coverage']:>12.1f}"
+              f"{s['choices']:>9.1f}{100 * s['dead_ends'] / cells:>13.1f}"
+              f"{100 * (s['junctions'] + s['crossings']) / cells:>13.1f}{100 * s['perfect']:>11.0f}",
+              flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+"""
+Instrumented tk canvas, for finding canvas item churn.
+
+Drop-in for tkinter.Canvas that counts the items created, deleted and
+reconfigured (itemconfigure/coords/move) and the time spent inside those
+TK calls, per frame and in total:
+
+    canvas = CountingCanvas(top, width=400, height=300)
+    ... draw a frame ...
+    canvas.update()          # ends the frame, see end_frame()
+    print(canvas.last_frame, canvas.totals)
+
+Frames end on each update() call, which is where the sand and waterfall
+drawing ends, or by calling end_frame() directly.
+"""
+
+import collections
+import time
+import tkinter
+
+
+class ChurnCounts:
+    """
+    Counts for one frame, or totals.
+    >>> a = ChurnCounts()
+    >>> a.created, a.tk_seconds = 100, 0.002
+    >>> b = ChurnCounts()
+    >>> b.created, b.deleted = 5, 100
+    >>> b.add(a)
+    >>> print(b)
+    created 105 deleted 100 configured 0 calls 0 tk 2.00ms
+    """
+    __slots__ = ('created', 'deleted', 'configured', 'calls', 'tk_seconds')
+
+    def __init__(self):
+        self.created = 0
+        self.deleted = 0
+        self.configured = 0
+        self.calls = 0
+        self.tk_seconds = 0.0
+
+    def add(self, other):
+        """Add other's counts into this one."""
+        self.created += other.created
+        self.deleted += other.deleted
+        self.configured += other.configured
+        self.calls += other.calls
+        self.tk_seconds += other.tk_seconds
+
+    def __str__(self):
+        return ('created {} deleted {} configured {} calls {} tk {:.2f}ms'
+                .format(self.created, self.deleted, self.configured, self.calls,
+                        self.tk_seconds * 1000))
+
+
+class CountingCanvas(tkinter.Canvas):
+    """
+    tkinter.Canvas that keeps ChurnCounts:
+        frame        counts so far in the current frame
+        last_frame   counts for the most recently ended frame
+        history      recent frames' counts, oldest first
+        totals       counts over all ended frames
+        frame_count  number of ended frames
+    """
+    def __init__(self, master=None, cnf={}, history=300, end_on_update=True, **kw):
+        super().__init__(master, cnf, **kw)
+        self.frame = ChurnCounts()
+        self.last_frame = ChurnCounts()
+        self.history = collections.deque(maxlen=history)
+        self.totals = ChurnCounts()
+        self.frame_count = 0
+        self.end_on_update = end_on_update
+        self.live = 0  # items on the canvas, so delete('all') can be counted
+
+    def _create(self, itemType, args, kw):
+        # All the create_xxx() methods come through here
+        start = time.perf_counter()
+        result = super()._create(itemType, args, kw)
+        self.frame.tk_seconds += time.perf_counter() - start
+        self.frame.calls += 1
+        self.frame.created += 1
+        self.live += 1
+        return result
+
+    def delete(self, *args):
+        if 'all' in args:
+            count = self.live
+        else:
+            count = sum(len(self.find_withtag(arg)) for arg in args)
+        start = time.perf_counter()
+        super().delete(*args)
+        self.frame.tk_seconds += time.perf_counter() - start
+        self.frame.calls += 1
+        self.frame.deleted += count
+        self.live -= count
+
+    def timed_change(self, method, args, kw):
+        """Run a reconfiguring Canvas method, counting and timing it."""
+        start = time.perf_counter()
+        result = method(self, *args, **kw)
+        self.frame.tk_seconds += time.perf_counter() - start
+        self.frame.calls += 1
+        self.frame.configured += 1
+        return result
+
+    def itemconfigure(self, *args, **kw):
+        return self.timed_change(tkinter.Canvas.itemconfigure, args, kw)
+
+    itemconfig = itemconfigure
+
+    def coords(self, *args):
+        return self.timed_change(tkinter.Canvas.coords, args, {})
+
+    def move(self, *args):
+        return self.timed_change(tkinter.Canvas.move, args, {})
+
+    def moveto(self, *args, **kw):
+        return self.timed_change(tkinter.Canvas.moveto, args, kw)
+
+    def update(self):
+        if self.end_on_update:
+            self.end_frame()
+        super().update()
+
+    def end_frame(self):
+        """Close out the current frame's counts and start a new frame."""
+        self.totals.add(self.frame)
+        self.history.append(self.frame)
+        self.last_frame = self.frame
+        self.frame = ChurnCounts()
+        self.frame_count += 1
+
+    def report(self):
+        """Multi-line summary of the totals and per-frame averages."""
+        frames = max(1, self.frame_count)
+        peak = max(self.history, key=lambda counts: counts.created + counts.deleted,
+                   default=ChurnCounts())
+        return ('{} frames, {} items on canvas\n'
+                'total    {}\n'
+                'average  created {:.1f} deleted {:.1f} configured {:.1f} tk {:.2f}ms\n'
+                'peak     {}'
+                .format(self.frame_count, self.live, self.totals,
+                        self.totals.created / frames, self.totals.deleted / frames,
+                        self.totals.configured / frames, self.totals.tk_seconds * 1000 / frames,
+                        peak))
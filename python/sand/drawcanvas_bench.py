@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+"""
+Drawing speed of the DrawCanvas modes.
+
+    python drawcanvas_bench.py [shapes] [frames] [stub]
+
+Draws frames frames (default 5) of shapes (default 20000) small filled
+rects in rgb colors, erasing between frames and calling update() at the
+end of each, as an animation would. Does this with plain TK drawing
+(fast_draw), with batch=True, and with the offscreen backend='image',
+then reports seconds per frame, shapes per second, and how many times
+faster batch is than plain. The TK modes need a display, and are
+skipped without one.
+
+With stub, the TK canvas is replaced by a Tcl command that only counts
+the items made, so the TK modes run without a display and time just
+what DrawCanvas and tkinter add on top of TK's own drawing.
+"""
+
+import sys
+import time
+import tkinter
+
+import drawcanvas
+from drawcanvas import DrawCanvas
+
+MODES = [
+    ('plain', {}),
+    ('batch', {'batch': True}),
+    ('image', {'backend': 'image'}),
+]
+
+
+def stub_canvas(width, height, title=None):
+    """
+    Stand-in for drawcanvas.make_canvas(): a tkinter.Canvas whose
+    TK command is a Tcl proc that counts the items made and nothing else.
+    """
+    interp = tkinter.Tcl()
+    interp.eval('proc .stub {args} {incr ::stub_items}')
+    canvas = tkinter.Canvas.__new__(tkinter.Canvas)
+    canvas.tk = interp.tk
+    canvas._w = '.stub'
+    canvas._tclCommands = None
+    return canvas
+
+
+def bench_one(options, shapes, frames, size=600):
+    """Seconds per frame drawing shapes rects with DrawCanvas(**options)."""
+    canvas = DrawCanvas(size, size, **options)
+    start = time.perf_counter()
+    for frame in range(frames):
+        canvas.erase()
+        for i in range(shapes):
+            x = (i * 7) % (size - 4)
+            y = (i * 13 + frame) % (size - 4)
+            canvas.fill_rect(x, y, 4, 4, color=(i % 256, (i * 3) % 256, 128))
+        canvas.update()
+    seconds = (time.perf_counter() - start) / frames
+    if options.get('backend') != 'image' and drawcanvas.make_canvas is not stub_canvas:
+        canvas.canvas.winfo_toplevel().destroy()
+    return seconds
+
+
+def main():
+    args = sys.argv[1:]
+    shapes = int(args[0]) if args else 20000
+    frames = int(args[1]) if len(args) > 1 else 5
+    if 'stub' in args[2:]:
+        drawcanvas.make_canvas = stub_canvas
+
+    print(f'{frames} frames of {shapes} shapes' + (', TK stubbed' if 'stub' in args[2:] else ''))
+    print(f"{'mode':<8}{'s/frame':>10}{'shapes/s':>12}")
+    results = {}
+    for name, options in MODES:
+        try:
+            seconds = bench_one(options, shapes, frames)
+        except tkinter.TclError as e:
+            print(f'{name:<8}  skipped, {e}')
+            continue
+        results[name] = seconds
+        print(f'{name:<8}{seconds:>10.3f}{shapes / seconds:>12.0f}', flush=True)
+    if 'plain' in results and 'batch' in results:
+        print(f"batch is {results['plain'] / results['batch']:.1f}x plain")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+"""
+Compact binary save/load for Grid, plus memory-mapped loading.
+
+File layout, integers little-endian:
+
+    magic      4 bytes   b'GRID'
+    version    1 byte    FORMAT_VERSION
+    encoding   1 byte    RAW or RLE
+    width      4 bytes
+    height     4 bytes
+    count      1 byte    number of materials in the table
+    materials  count x (1 byte length + utf-8 bytes)
+    rows       height rows of square codes
+
+Square code 0 is always None, code i is materials[i - 1].
+RAW rows are width bytes each, so the whole body can be memory-mapped
+and used directly with no parsing, see mmap_grid().
+RLE rows are (run, code) byte pairs, runs never cross a row.
+"""
+
+import mmap
+import struct
+import sys
+
+from grid import Grid
+
+MAGIC = b'GRID'
+FORMAT_VERSION = 1
+RAW = 0
+RLE = 1
+
+_HEADER = struct.Struct('<4sBBIIB')
+
+
+class ByteGrid(Grid):
+    """
+    Grid storing one byte per square in a flat buffer,
+    a bytearray normally or a memoryview onto an mmap.
+    Works anywhere a Grid does: get() set() in_bounds() copy().
+    """
+    def __init__(self, width, height, materials=(), buf=None):
+        """
+        Create grid width by height, all None unless buf is given.
+        materials lists the non-None square values, in code order.
+        """
+        self.width = width
+        self.height = height
+        self.materials = [None] + list(materials)
+        self.codes = {val: code for code, val in enumerate(self.materials)}
+        if buf is None:
+            buf = bytearray(width * height)
+        self.buf = buf
+        # True when buf writes through to a file whose header holds the table
+        self.table_fixed = False
+
+    @property
+    def array(self):
+        """Nested-list form of the contents, built on demand."""
+        mats = self.materials
+        buf = self.buf
+        w = self.width
+        return [[mats[code] for code in buf[y * w:(y + 1) * w]] for y in range(self.height)]
+
+    @array.setter
+    def array(self, lst):
+        raise Exception('ByteGrid contents are set with set(), not .array')
+
+    def get(self, x, y):
+        """
+        Gets the value stored at x,y.
+        >>> grid = ByteGrid(2, 1, ['r'])
+        >>> grid.set(1, 0, 'r')
+        >>> grid.get(1, 0), grid.get(0, 0)
+        ('r', None)
+        """
+        if not self.in_bounds(x, y):
+            raise RuntimeError('out of bounds get({}, {}) on grid width {}, height {}'
+                               .format(x, y, self.width, self.height))
+        return self.materials[self.buf[y * self.width + x]]
+
+    def set(self, x, y, val):
+        """
+        Sets a new value into the grid at x,y.
+        Values not yet in the material table are added to it.
+        """
+        if not self.in_bounds(x, y):
+            raise Exception('out of bounds set({}, {}) on grid width {}, height {}'
+                            .format(x, y, self.width, self.height))
+        code = self.codes.get(val)
+        if code is None:
+            code = self.add_material(val)
+        self.buf[y * self.width + x] = code
+
+    def add_material(self, val):
+        """Add val to the material table, returning its code."""
+        if not isinstance(val, str):
+            raise Exception('ByteGrid values must be str or None, got:' + repr(val))
+        if self.table_fixed:
+            raise Exception('ByteGrid material table is fixed by its file, cannot add:' + repr(val))
+        if len(self.materials) >= 256:
+            raise Exception('ByteGrid material table full, cannot add:' + repr(val))
+        self.materials.append(val)
+        self.codes[val] = len(self.materials) - 1
+        return self.codes[val]
+
+    def copy(self):
+        """Return a new ByteGrid, a duplicate of the original in a fresh bytearray."""
+        return ByteGrid(self.width, self.height, self.materials[1:], bytearray(self.buf))
+
+    @staticmethod
+    def from_grid(grid):
+        """
+        Utility. Make a ByteGrid with the same contents as any Grid.
+        >>> ByteGrid.from_grid(Grid.build([['w', None], ['r', 'w']]))
+        [['w', None], ['r', 'w']]
+        """
+        result = ByteGrid(grid.width, grid.height)
+        for y in range(grid.height):
+            for x in range(grid.width):
+                val = grid.get(x, y)
+                if val is not None:
+                    result.set(x, y, val)
+        return result
+
+
+def dumps(grid, encoding=RLE):
+    """
+    Return the file-format bytes for the given grid.
+    >>> data = dumps(Grid.build([['w', 'w', None], ['r', None, None]]), encoding=RAW)
+    >>> data[:4], len(data)
+    (b'GRID', 25)
+    """
+    if not isinstance(grid, ByteGrid):
+        grid = ByteGrid.from_grid(grid)
+    mats = [val.encode('utf-8') for val in grid.materials[1:]]
+
+    out = bytearray(_HEADER.pack(MAGIC, FORMAT_VERSION, encoding, grid.width, grid.height, len(mats)))
+    for mat in mats:
+        if len(mat) > 255:
+            raise Exception('material name too long to save:' + repr(mat))
+        out.append(len(mat))
+        out += mat
+
+    w = grid.width
+    if encoding == RAW:
+        out += grid.buf[:w * grid.height]
+    elif encoding == RLE:
+        for y in range(grid.height):
+            out += _rle_row(grid.buf[y * w:(y + 1) * w])
+    else:
+        raise Exception('unknown grid encoding:' + str(encoding))
+    return bytes(out)
+
+
+def _rle_row(row):
+    """
+    (run, code) pairs for one row of codes, runs of at most 255.
+    >>> list(_rle_row(bytes([0, 0, 0, 2, 1, 1])))
+    [3, 0, 1, 2, 2, 1]
+    """
+    out = bytearray()
+    i = 0
+    n = len(row)
+    while i < n:
+        code = row[i]
+        j = i + 1
+        while j < n and row[j] == code and j - i < 255:
+            j += 1
+        out.append(j - i)
+        out.append(code)
+        i = j
+    return out
+
+
+def _read_header(data):
+    """
+    Parse the header at the start of data.
+    Returns (encoding, width, height, materials, body_offset).
+    """
+    if len(data) < _HEADER.size:
+        raise Exception('grid file too short for header')
+    magic, version, encoding, width, height, count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise Exception('not a grid file, bad magic:' + repr(magic))
+    if version != FORMAT_VERSION:
+        raise Exception('unsupported grid file version:' + str(version))
+    offset = _HEADER.size
+    materials = []
+    for i in range(count):
+        size = data[offset]
+        materials.append(bytes(data[offset + 1:offset + 1 + size]).decode('utf-8'))
+        offset += 1 + size
+    return encoding, width, height, materials, offset
+
+
+def loads(data):
+    """
+    Build a ByteGrid from file-format bytes.
+    >>> grid = Grid.build([['w', 'w', None], ['r', None, None]])
+    >>> loads(dumps(grid))
+    [['w', 'w', None], ['r', None, None]]
+    >>> loads(dumps(grid, encoding=RAW)).get(0, 1)
+    'r'
+    """
+    encoding, width, height, materials, offset = _read_header(data)
+    size = width * height
+    if encoding == RAW:
+        buf = bytearray(data[offset:offset + size])
+    elif encoding == RLE:
+        buf = bytearray()
+        for i in range(offset, len(data) - 1, 2):
+            buf += bytes((data[i + 1],)) * data[i]
+    else:
+        raise Exception('unknown grid encoding:' + str(encoding))
+    if len(buf) != size:
+        raise Exception('grid file body has {} squares, expected {}'.format(len(buf), size))
+    return ByteGrid(width, height, materials, buf)
+
+
+def save_grid(grid, filename, encoding=RLE):
+    """
+    Save grid to filename. Use encoding=RAW for files
+    that will be opened with mmap_grid().
+    """
+    with open(filename, 'wb') as f:
+        f.write(dumps(grid, encoding))
+
+
+def load_grid(filename):
+    """Load a saved grid file, either encoding, into a ByteGrid."""
+    with open(filename, 'rb') as f:
+        return loads(f.read())
+
+
+def mmap_grid(filename, mode='r'):
+    """
+    Memory-map a RAW grid file and return a ByteGrid that reads
+    its squares straight out of the mapping, with no parsing or copying.
+    Processes mapping the same file share its pages.
+    mode is 'r' read-only (set() errors), 'c' copy-on-write private changes,
+    or 'w' changes written through to the file. The file's material table
+    is in its header, so with 'w' set() only takes values already in it.
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'level.grid')
+    >>> save_grid(Grid.build([['w', None], ['r', 'r']]), path, encoding=RAW)
+    >>> grid = mmap_grid(path, mode='c')
+    >>> grid.set(1, 0, 'w')
+    >>> grid
+    [['w', 'w'], ['r', 'r']]
+    >>> load_grid(path)
+    [['w', None], ['r', 'r']]
+    >>> grid = mmap_grid(path, mode='w')
+    >>> grid.set(1, 0, 'r')
+    >>> grid.set(0, 0, 's')
+    Traceback (most recent call last):
+    ...
+    Exception: ByteGrid material table is fixed by its file, cannot add:'s'
+    >>> load_grid(path)
+    [['w', 'r'], ['r', 'r']]
+    """
+    access = {'r': mmap.ACCESS_READ, 'c': mmap.ACCESS_COPY, 'w': mmap.ACCESS_WRITE}.get(mode)
+    if access is None:
+        raise Exception("mmap_grid mode must be 'r', 'c' or 'w', got:" + repr(mode))
+    with open(filename, 'r+b' if mode == 'w' else 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=access)
+    encoding, width, height, materials, offset = _read_header(mm)
+    if encoding != RAW:
+        mm.close()
+        raise Exception('mmap_grid needs a RAW encoded file: ' + filename)
+    if len(mm) < offset + width * height:
+        mm.close()
+        raise Exception('grid file truncated: ' + filename)
+    buf = memoryview(mm)[offset:offset + width * height]
+    grid = ByteGrid(width, height, materials, buf)
+    grid.table_fixed = mode == 'w'
+    return grid
+
+
+def main():
+    args = sys.argv[1:]
+    # Print the size and material table of each grid file named on the command line
+    for filename in args:
+        grid = load_grid(filename)
+        print(filename, grid.width, 'x', grid.height, grid.materials[1:])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+"""
+Deadline-paced tk timer for simulation loops.
+
+The plain start_timer()/my_timer() pattern posts a fixed after(delay)
+once the work is done, so the real period is the delay plus the work time,
+and the animation slows down as the work grows. Pacer instead keeps a
+time.monotonic() deadline per round, posts after() for whatever time is
+left, and when it falls behind runs several simulation steps before one draw.
+
+    pacer = Pacer(top, 30, step_fn, draw_fn)
+    pacer.start()
+
+Every Pacer keeps FrameStats on its ticks: achieved fps, late frames
+and a histogram of the time between frames.
+"""
+
+import collections
+import time
+
+
+class Pacer:
+    """
+    Calls step() once per period_ms and draw() after the steps of each tick.
+    When a tick runs late, it runs up to max_steps steps to catch up,
+    and the draws for the extra steps are dropped.
+    Counters, readable any time:
+        steps          total step() calls
+        draws          total draw() calls
+        dropped_draws  steps that did not get their own draw
+        drift          seconds the latest tick started after its deadline
+        max_drift      largest drift seen
+        resyncs        times it was too far behind and skipped steps
+        stats          FrameStats for the ticks
+    """
+    def __init__(self, top, period_ms, step, draw=None, max_steps=4, clock=time.monotonic):
+        """
+        top is any tk widget, used for after().
+        clock can be swapped for testing.
+        """
+        self.top = top
+        self.period = period_ms / 1000
+        self.step = step
+        self.draw = draw
+        self.max_steps = max_steps
+        self.clock = clock
+        self.running = False
+        self.deadline = 0
+        self.steps = 0
+        self.draws = 0
+        self.dropped_draws = 0
+        self.drift = 0
+        self.max_drift = 0
+        self.resyncs = 0
+        self.stats = FrameStats(period_ms)
+
+    def start(self):
+        """Start ticking, the first tick one period from now."""
+        self.running = True
+        self.deadline = self.clock() + self.period
+        self.top.after(int(self.period * 1000), self.tick)
+
+    def stop(self):
+        """Stop after the current tick, if any."""
+        self.running = False
+
+    def tick(self):
+        """
+        One timer callback: run the due steps, draw, post the next tick.
+        >>> times = iter([0.0, 0.030, 0.035, 0.125, 0.130, 0.150, 0.155])
+        >>> delays = []
+        >>> class Top:
+        ...     def after(self, ms, fn): delays.append(ms)
+        >>> log = []
+        >>> pacer = Pacer(Top(), 30, lambda: log.append('s'), lambda: log.append('d'),
+        ...               clock=lambda: next(times))
+        >>> pacer.start()          # t=0, deadline 0.030
+        >>> pacer.tick()           # on time at 0.030, next deadline 0.060
+        >>> pacer.tick()           # 65ms late at 0.125, catch up 3 steps
+        >>> log
+        ['s', 'd', 's', 's', 's', 'd']
+        >>> delays
+        [30, 25, 20]
+        >>> pacer.dropped_draws, round(pacer.drift, 3)
+        (2, 0.065)
+        """
+        if not self.running:
+            return
+        now = self.clock()
+        late = now - self.deadline
+        count = 1
+        if late >= self.period:
+            count = min(self.max_steps, 1 + int(late / self.period))
+
+        for i in range(count):
+            self.step()
+        self.steps += count
+        self.dropped_draws += count - 1
+        if self.draw:
+            self.draw()
+            self.draws += 1
+
+        self.drift = max(0, late)
+        self.max_drift = max(self.max_drift, self.drift)
+        self.stats.record(now, late > self.period / 2)
+        self.deadline += count * self.period
+
+        now = self.clock()
+        if now - self.deadline > self.max_steps * self.period:
+            # Too far behind to ever catch up, let those steps go
+            self.deadline = now
+            self.resyncs += 1
+        delay_ms = max(1, round((self.deadline - now) * 1000))
+        self.top.after(delay_ms, self.tick)
+
+    def __str__(self):
+        return ('steps {} draws {} dropped {} drift {:.1f}ms max {:.1f}ms resyncs {}'
+                .format(self.steps, self.draws, self.dropped_draws,
+                        self.drift * 1000, self.max_drift * 1000, self.resyncs))
+
+
+class FrameStats:
+    """
+    Frame accounting for a paced loop.
+        frames       frames recorded
+        late_frames  frames that started over half a period past their deadline
+        fps()        achieved frames per second
+        histogram()  time between frame starts, as (low_ms, count) buckets
+    >>> stats = FrameStats(30)
+    >>> for t in [0.0, 0.030, 0.060, 0.100, 0.130]:
+    ...     stats.record(t, late=(t == 0.100))
+    >>> stats.frames, stats.late_frames, round(stats.fps(), 1)
+    (5, 1, 30.8)
+    >>> stats.histogram()
+    [(30, 3), (40, 1)]
+    """
+    def __init__(self, period_ms, bucket_ms=5):
+        self.period_ms = period_ms
+        self.bucket_ms = bucket_ms
+        self.frames = 0
+        self.late_frames = 0
+        self.first = None
+        self.last = None
+        self.buckets = collections.Counter()
+
+    def record(self, start, late=False):
+        """Record a frame starting at time start, in seconds."""
+        if self.last is None:
+            self.first = start
+        else:
+            # small epsilon so float noise in e.g. 0.060 - 0.030 lands in the right bucket
+            ms = (start - self.last) * 1000 + 1e-6
+            self.buckets[int(ms // self.bucket_ms) * self.bucket_ms] += 1
+        self.last = start
+        self.frames += 1
+        if late:
+            self.late_frames += 1
+
+    def fps(self):
+        """Achieved frames per second so far, 0 until there are 2 frames."""
+        if self.frames < 2 or self.last == self.first:
+            return 0
+        return (self.frames - 1) / (self.last - self.first)
+
+    def histogram(self):
+        """Sorted list of (low_ms, count), one per bucket_ms wide bucket."""
+        return sorted(self.buckets.items())
+
+    def __str__(self):
+        return ('{} frames {:.1f} fps (target {:.1f}) late {}'
+                .format(self.frames, self.fps(), 1000 / self.period_ms, self.late_frames))
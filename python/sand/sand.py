@@ -9,7 +9,9 @@ import tkinter
 import random
 import datetime
 
+from canvasstats import CountingCanvas
 from grid import Grid
+from pacing import Pacer
 
 
 def do_move(grid, x_from, y_from, x_to, y_to):
@@ -287,6 +289,8 @@ fps_label = None
 
 SIDE = 14  # pixels across of one square (set in main() too)
 SHIFT = 6
+CANVAS_STATS = False  # True: count canvas item churn, report on exit
+PACER_STATS = False  # True: report frame pacing (fps, late frames) on exit
 
 
 # provided function to build the GUI
@@ -336,7 +340,8 @@ def make_gui(top, width, height):
     fps_label.grid(row=0, column=7, sticky='w')
 
     # canvas for drawing
-    canvas = tkinter.Canvas(top, width=width, height=height, name='canvas')
+    canvas_class = CountingCanvas if CANVAS_STATS else tkinter.Canvas
+    canvas = canvas_class(top, width=width, height=height, name='canvas')
 
     canvas.xview_scroll(SHIFT, "units")  # hack so (0, 0) works correctly
     canvas.yview_scroll(SHIFT, "units")
@@ -375,6 +380,10 @@ def big_erase(grid, x, y, canvas):
 # delay between calling the timer
 TIMER_MS = 1
 
+# Set to a period in ms to run on a Pacer instead: gravity rounds then run
+# at that steady rate, with several rounds per draw when drawing falls behind.
+PACE_MS = None
+
 
 def start_timer(top, fn):
     """Start the my_timer system, calls given fn"""
@@ -389,6 +398,12 @@ def my_timer(top, fn):
 
 def sand_action(grid, canvas, scale):
     """This function runs on timer for all periodic tasks."""
+    sand_step(grid)
+    sand_draw(grid, canvas, scale)
+
+
+def sand_step(grid):
+    """The mouse and gravity part of sand_action(), no drawing."""
     global gravity
     global mouse_fn
     global brownian_on
@@ -403,6 +418,10 @@ def sand_action(grid, canvas, scale):
         else:
             val = brownian_val.get()
         do_whole_grid(grid, val)
+
+
+def sand_draw(grid, canvas, scale):
+    """The drawing part of sand_action()."""
     draw_grid_canvas(grid, canvas, scale)
     fps_update()
 
@@ -461,9 +480,18 @@ def main():
     canvas.bind("<Button-1>", lambda evt: do_mouse(evt, grid, SIDE, canvas))
     canvas.bind("<ButtonRelease-1>", lambda evt: do_mouse_up(evt))
 
-    start_timer(top, lambda: sand_action(grid, canvas, SIDE))
+    if PACE_MS:
+        pacer = Pacer(top, PACE_MS, lambda: sand_step(grid), lambda: sand_draw(grid, canvas, SIDE))
+        pacer.start()
+    else:
+        start_timer(top, lambda: sand_action(grid, canvas, SIDE))
 
     tkinter.mainloop()
+    if CANVAS_STATS:
+        print(canvas.report())
+    if PACER_STATS and PACE_MS:
+        print(pacer)
+        print(pacer.stats, pacer.stats.histogram())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+"""
+Cached glyph drawing of a Grid onto a tk canvas.
+
+draw_grid_canvas() in waterfall.py erases the canvas and lays out
+a fresh font create_text() for every square, every round.
+TileView instead renders each square value's glyph once into an image
+tile, keeps one canvas item per square, and on each draw() only touches
+the squares whose value changed since the previous draw.
+Pillow is used to render the tiles; without it TileView falls back to
+reusing one text item per square, which still avoids the item churn.
+"""
+
+import tkinter
+
+from drawcanvas import load_font
+
+try:
+    from PIL import Image, ImageDraw, ImageTk
+except ImportError:
+    Image = None
+
+
+class TileView:
+    """
+    Draws a grid of glyphs, one side-pixel square per grid square,
+    on a black background by default.
+    Usage: view = TileView(canvas, grid.width, grid.height, SIDE)
+    then view.draw(grid) each round.
+    """
+    def __init__(self, canvas, width, height, side, font=('Courier', 20), fg='white', bg='black'):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.side = side
+        self.font = font
+        self.fg = fg
+        canvas.delete('all')
+        canvas.create_rectangle(0, 0, width * side, height * side, fill=bg)
+        # Item id per square, 0 until the square first shows something
+        self.items = [[0] * width for y in range(height)]
+        # Value shown per square, as of the last draw()
+        self.rows = [[None] * width for y in range(height)]
+        self.tiles = {}
+        self.use_images = Image is not None
+
+    def tile(self, val):
+        """The PhotoImage tile for val, rendered on first use."""
+        image = self.tiles.get(val)
+        if image is None:
+            image = ImageTk.PhotoImage(self.render_glyph(str(val)), master=self.canvas)
+            self.tiles[val] = image  # tk needs the python ref kept alive
+        return image
+
+    def render_glyph(self, text):
+        """Pillow RGBA image of text in the fg color, transparent elsewhere."""
+        pixels = int(round(self.canvas.winfo_fpixels('{}p'.format(self.font[1]))))
+        font = load_font(pixels)
+        left, top, right, bottom = font.getbbox(text)
+        image = Image.new('RGBA', (max(1, right), max(1, bottom)), (0, 0, 0, 0))
+        ImageDraw.Draw(image).text((0, 0), text, font=font, fill=self.fg)
+        return image
+
+    def show(self, x, y, val):
+        """Make square x,y show val, None hides it."""
+        canvas = self.canvas
+        item = self.items[y][x]
+        if val is None:
+            if item:
+                canvas.itemconfigure(item, state='hidden')
+            return
+        if not item:
+            px = x * self.side
+            py = y * self.side
+            if self.use_images:
+                item = canvas.create_image(px, py, image=self.tile(val), anchor=tkinter.NW)
+            else:
+                item = canvas.create_text(px, py, text=val, anchor=tkinter.NW,
+                                          fill=self.fg, font=self.font)
+            self.items[y][x] = item
+        elif self.use_images:
+            canvas.itemconfigure(item, image=self.tile(val), state='normal')
+        else:
+            canvas.itemconfigure(item, text=val, state='normal')
+
+    def draw(self, grid):
+        """
+        Update the canvas to show grid, touching only changed squares.
+        Works with Grid or anything with the same .array rows.
+        """
+        rows = self.rows
+        for y, row in enumerate(grid.array):
+            old = rows[y]
+            if row == old:
+                continue
+            for x, val in enumerate(row):
+                if val != old[x]:
+                    self.show(x, y, val)
+            rows[y] = list(row)
+        self.canvas.update()
@@ -9,11 +9,16 @@ import tkinter
 import random
 import drawcanvas
 
+from canvasstats import CountingCanvas
 from grid import Grid
+from pacing import Pacer
+from tileview import TileView
 
 SIDE = 15  # pixels across of one square
 WATER_FACTOR = 20  # 1 out of this factor is water in top edge
 ROCK_FACTOR = 10   # 1 out of this factor is rock at the start
+CANVAS_STATS = False  # True: count canvas item churn, report on exit
+PACER_STATS = False  # True: report frame pacing (fps, late frames) on exit
 
 
 def is_move_ok(grid, x_to, y_to):
@@ -134,13 +139,28 @@ def draw_grid_canvas(grid, canvas):
     canvas.update()
 
 
-def do_one_round(grid, canvas):
-    """Do one round of the move, call in timer."""
+def do_one_round(grid, canvas, view=None):
+    """
+    Do one round of the move, call in timer.
+    Draws with the TileView if given, otherwise draw_grid_canvas().
+    """
     set_top(grid)
-    draw_grid_canvas(grid, canvas)
+    if view:
+        view.draw(grid)
+    else:
+        draw_grid_canvas(grid, canvas)
     move_all_water(grid)
 
 
+def step_round(grid):
+    """
+    do_one_round() minus the drawing, for the Pacer:
+    move the water, then refill the top for the next draw.
+    """
+    move_all_water(grid)
+    set_top(grid)
+
+
 # TK Timer fns:
 
 def start_timer(top, delay_ms, fn):
@@ -167,12 +187,23 @@ def main():
     grid = Grid(width, height)
     init_rocks(grid)
 
-    canvas = drawcanvas.make_canvas(width * SIDE, height * SIDE, 'Waterfall')
-    draw_grid_canvas(grid, canvas)
+    canvas_class = CountingCanvas if CANVAS_STATS else tkinter.Canvas
+    canvas = drawcanvas.make_canvas(width * SIDE, height * SIDE, 'Waterfall', canvas_class)
+    view = TileView(canvas, width, height, SIDE)
+    set_top(grid)
+    view.draw(grid)
 
-    start_timer(canvas, 30, lambda: do_one_round(grid, canvas))
+    # Paced against the clock, so big grids run extra rounds per draw
+    # rather than slowing down. start_timer() is the fixed-delay version.
+    pacer = Pacer(canvas, 30, lambda: step_round(grid), lambda: view.draw(grid))
+    pacer.start()
 
     drawcanvas.DrawCanvas.mainloop()
+    if CANVAS_STATS:
+        print(canvas.report())
+    if PACER_STATS:
+        print(pacer)
+        print(pacer.stats, pacer.stats.histogram())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+
+"""
+NumPy engine for the Waterfall rules.
+Same rules as waterfall.py: water falls down, else down-left,
+else down-right, else evaporates. Rocks and the top-row water
+are seeded with whole-array random masks instead of one
+randrange() per square.
+
+Run like waterfall.py:  python3 waterfall_fast.py [width height]
+Headless flow statistics, no window:
+    python3 waterfall_fast.py -headless width height rounds [seed] [-csv]
+"""
+
+import collections
+import csv
+import sys
+import time
+
+import numpy as np
+
+import drawcanvas
+import waterfall
+from grid import Grid
+from pacing import Pacer
+from tileview import TileView
+
+EMPTY = 0
+WATER = 1
+ROCK = 2
+
+# Square value for each code, matching the strings waterfall.py uses
+VALUES = [None, 'w', 'r']
+
+
+class WaterfallEngine:
+    """
+    Waterfall world stored as a height x width uint8 array of
+    EMPTY/WATER/ROCK codes. Has the Grid width/height/get/in_bounds
+    interface, so waterfall.draw_grid_canvas() can draw it directly.
+    """
+    def __init__(self, width, height, seed=None):
+        """
+        Create an empty world width by height.
+        seed makes the rock and water seeding repeatable.
+        """
+        self.cells = np.zeros((height, width), dtype=np.uint8)
+        self.rng = np.random.default_rng(seed)
+        # Counts from the most recent set_top() and move_all_water()
+        self.spawned = 0
+        self.moved = 0
+        self.evaporated = 0
+
+    @property
+    def width(self):
+        return self.cells.shape[1]
+
+    @property
+    def height(self):
+        return self.cells.shape[0]
+
+    @staticmethod
+    def build(lst, seed=None):
+        """
+        Utility. Construct from a nested-list literal, like Grid.build().
+        >>> WaterfallEngine.build([['w', 'w', 'w'], ['r', None, 'w']])
+        [['w', 'w', 'w'], ['r', None, 'w']]
+        """
+        return WaterfallEngine.from_grid(Grid.build(lst), seed)
+
+    @staticmethod
+    def from_grid(grid, seed=None):
+        """Make an engine holding the contents of any Grid."""
+        engine = WaterfallEngine(grid.width, grid.height, seed)
+        for y in range(grid.height):
+            for x in range(grid.width):
+                engine.set(x, y, grid.get(x, y))
+        return engine
+
+    def to_grid(self):
+        """Return the contents as a regular Grid."""
+        return Grid.build(self.array)
+
+    @property
+    def array(self):
+        """Nested-list form of the contents, as in Grid.array."""
+        return [[VALUES[code] for code in row] for row in self.cells.tolist()]
+
+    def in_bounds(self, x, y):
+        """Returns True if the x,y is in bounds of the world. False otherwise."""
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y):
+        """Gets the 'w', 'r' or None value at x,y."""
+        if not self.in_bounds(x, y):
+            raise RuntimeError('out of bounds get({}, {}) on grid width {}, height {}'
+                               .format(x, y, self.width, self.height))
+        return VALUES[self.cells[y, x]]
+
+    def set(self, x, y, val):
+        """
+        Sets 'w', 'r' or None at x,y. Any other non-None value
+        is stored as rock, since to water it is just an obstacle.
+        """
+        if not self.in_bounds(x, y):
+            raise Exception('out of bounds set({}, {}) on grid width {}, height {}'
+                            .format(x, y, self.width, self.height))
+        if val is None:
+            self.cells[y, x] = EMPTY
+        elif val == 'w':
+            self.cells[y, x] = WATER
+        else:
+            self.cells[y, x] = ROCK
+
+    def __repr__(self):
+        return repr(self.array)
+
+    def __str__(self):
+        return repr(self.array)
+
+    def init_rocks(self):
+        """
+        Set a random 1-in-ROCK_FACTOR selection of squares to rock.
+        >>> engine = WaterfallEngine(100, 100, seed=1).init_rocks()
+        >>> 800 < int((engine.cells == ROCK).sum()) < 1200
+        True
+        """
+        mask = self.rng.integers(waterfall.ROCK_FACTOR, size=self.cells.shape) == 0
+        self.cells[mask] = ROCK
+        return self
+
+    def set_top(self):
+        """
+        Set a random 1-in-WATER_FACTOR selection of the top row to water.
+        As in waterfall.set_top(), this overwrites whatever was there.
+        Sets .spawned to the number of squares that became water.
+        """
+        mask = self.rng.integers(waterfall.WATER_FACTOR, size=self.width) == 0
+        self.spawned = int((mask & (self.cells[0] != WATER)).sum())
+        self.cells[0, mask] = WATER
+        return self
+
+    def move_all_water(self):
+        """
+        Move every water once, with the same result as waterfall.move_all_water().
+        Sets .moved and .evaporated to the counts for this round.
+        >>> WaterfallEngine.build([['w', 'w', 'w'], ['r', None, 'w']]).move_all_water()
+        [[None, None, None], ['r', 'w', 'w']]
+        >>> WaterfallEngine.build([['r', 'w'], [None, None], [None, None]]).move_all_water()
+        [['r', None], [None, 'w'], [None, None]]
+        >>> WaterfallEngine.build([['w', None, 'w'], [None, 'r', None]]).move_all_water()
+        [[None, None, None], ['w', 'r', 'w']]
+        >>> engine = WaterfallEngine.build([['w', 'w', 'w'], ['r', None, 'w']]).move_all_water()
+        >>> engine.moved, engine.evaporated
+        (2, 2)
+        """
+        cells = self.cells
+        if cells.shape[0] < 2:
+            self.moved = 0
+            self.evaporated = int((cells == WATER).sum())
+            cells[cells == WATER] = EMPTY
+            return self
+
+        # waterfall.py goes bottom-up, so by the time row y moves, every water
+        # in row y+1 has already left it. The squares row y can land on are then
+        # blocked only by non-water, plus water row y itself has already put
+        # there. So each row pair is independent and all rows move at once.
+        # Within a row the left-to-right order matters, so scan x in order,
+        # working on whole columns. Arrays here are transposed, [x, y].
+        water = cells == WATER
+        blocked = (cells[1:] != EMPTY) & ~water[1:]
+        taken = blocked.T.copy()
+        falling = np.ascontiguousarray(water[:-1].T)
+        last = self.width - 1
+
+        for x in np.flatnonzero(falling.any(axis=1)):
+            col = falling[x]
+            # down
+            moved = col & ~taken[x]
+            taken[x] |= moved
+            rest = col & ~moved
+            # down-left
+            if x > 0:
+                moved = rest & ~taken[x - 1]
+                taken[x - 1] |= moved
+                rest &= ~moved
+            # down-right
+            if x < last:
+                moved = rest & ~taken[x + 1]
+                taken[x + 1] |= moved
+
+        landed = (taken & ~blocked.T).T
+        cells[water] = EMPTY
+        cells[1:][landed] = WATER
+        self.moved = int(landed.sum())
+        self.evaporated = int(water.sum()) - self.moved
+        return self
+
+
+# Per-round counters from run_headless(). resident is the water counted
+# on the grid as drawn, after set_top() and before move_all_water(); each
+# of those either moves or evaporates.
+RoundStats = collections.namedtuple('RoundStats', 'round spawned moved evaporated resident')
+
+
+def run_headless(width, height, rounds, seed=None):
+    """
+    Generator running rounds of the waterfall with no window,
+    yielding one RoundStats per round as it goes.
+    Each round is set_top() then move_all_water(), as in do_one_round().
+    >>> stats = list(run_headless(30, 20, 100, seed=7))
+    >>> len(stats), stats[-1].round
+    (100, 100)
+    >>> all(s.resident == s.moved + s.evaporated for s in stats)
+    True
+    >>> stats[5].resident == stats[4].moved + stats[5].spawned
+    True
+    """
+    engine = WaterfallEngine(width, height, seed)
+    engine.init_rocks()
+    for i in range(1, rounds + 1):
+        engine.set_top()
+        resident = int((engine.cells == WATER).sum())
+        engine.move_all_water()
+        yield RoundStats(i, engine.spawned, engine.moved, engine.evaporated, resident)
+
+
+def write_stats(stats, out, csv_format=False):
+    """
+    Write each RoundStats to the out file as it arrives, plain columns
+    or CSV with a header line. Returns the number of rounds written.
+    """
+    count = 0
+    if csv_format:
+        writer = csv.writer(out)
+        writer.writerow(RoundStats._fields)
+        for row in stats:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in stats:
+            out.write('{} {} {} {} {}\n'.format(*row))
+            count += 1
+    return count
+
+
+def do_one_round(engine, view):
+    """Do one round of the move, call in timer."""
+    engine.set_top()
+    view.draw(engine)
+    engine.move_all_water()
+
+
+def step_round(engine):
+    """One round minus the drawing, for the Pacer, as in waterfall.step_round()."""
+    engine.move_all_water()
+    engine.set_top()
+
+
+def headless_main(args):
+    """
+    -headless width height rounds [seed] [-csv]
+    Streams the per-round stats to stdout, rounds/sec to stderr.
+    """
+    csv_format = '-csv' in args
+    args = [arg for arg in args if arg != '-csv']
+    width = int(args[0])
+    height = int(args[1])
+    rounds = int(args[2])
+    seed = int(args[3]) if len(args) > 3 else None
+
+    start = time.perf_counter()
+    count = write_stats(run_headless(width, height, rounds, seed), sys.stdout, csv_format)
+    elapsed = time.perf_counter() - start
+    print('{} rounds in {:.3f}s, {:.1f} rounds/sec'.format(count, elapsed, count / max(elapsed, 1e-9)),
+          file=sys.stderr)
+
+
+def main():
+    args = sys.argv[1:]
+
+    if args and args[0] == '-headless':
+        headless_main(args[1:])
+        return
+
+    width = 60
+    height = 40
+
+    # Optional command line setting of -width- -height-
+    if len(args) == 2:
+        width = int(args[0])
+        height = int(args[1])
+    engine = WaterfallEngine(width, height)
+    engine.init_rocks()
+
+    canvas = drawcanvas.make_canvas(width * waterfall.SIDE, height * waterfall.SIDE, 'Waterfall')
+    view = TileView(canvas, width, height, waterfall.SIDE)
+    engine.set_top()
+    view.draw(engine)
+
+    pacer = Pacer(canvas, 30, lambda: step_round(engine), lambda: view.draw(engine))
+    pacer.start()
+
+    drawcanvas.DrawCanvas.mainloop()
+
+
+if __name__ == '__main__':
+    main()